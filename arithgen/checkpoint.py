@@ -0,0 +1,36 @@
+"""Checkpoints of batch generation progress."""
+
+import json
+import os
+import random
+
+
+def save_checkpoint(filename, data):
+    """Write the dict data to filename atomically."""
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+
+def load_checkpoint(filename):
+    """Return the checkpoint dict in filename, or None if not found."""
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def get_rng_state(rng=random):
+    """Return the state of rng in a JSON-serializable form."""
+    version, internal_state, gauss_next = rng.getstate()
+    return [version, list(internal_state), gauss_next]
+
+
+def set_rng_state(state, rng=random):
+    """Restore the state of rng from get_rng_state() output."""
+    version, internal_state, gauss_next = state
+    rng.setstate((version, tuple(internal_state), gauss_next))
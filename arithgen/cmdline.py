@@ -10,16 +10,79 @@ Options:
                                    generate. [default: 1]
     -d, --difficulty=<difficulty>  Specify the complexity of
                                    expressions. [default: 3]
-    -F, --format=<format>          Specify the output format.
-                                   [default: {expr} = {result}]
+    -e, --engine=<engine>          Specify the generation engine,
+                                   recursive or shape (sample the tree
+                                   shape first, then fill in values).
+                                   [default: recursive]
+    -F, --format=<format>          Specify the output format. The
+                                   fields are {expr}, {result} and
+                                   {index}. [default: {expr} = {result}]
+    -S, --seed=<seed>              Generate reproducibly from an integer
+                                   seed. Each expression is determined
+                                   by the seed and its index alone.
+    --shard=<shard>                Only generate shard i/N of the count
+                                   expressions, where 0 <= i < N.
+                                   Requires --seed. Use arithgen-merge
+                                   to combine the outputs of all shards.
+    -o, --output=<file>            Write to a file instead of standard
+                                   output.
+    -c, --checkpoint=<file>        Periodically save progress to a
+                                   checkpoint file. Requires --output.
+    --checkpoint-every=<count>     Save a checkpoint every this many
+                                   expressions. [default: 10000]
+    --resume                       Continue from the checkpoint file,
+                                   producing the same output as an
+                                   uninterrupted run. Starts from the
+                                   beginning if there is no checkpoint.
+    --analyze                      Instead of the expressions, output
+                                   statistics about them as JSON. Use
+                                   arithgen-merge --stats to combine the
+                                   statistics of several shards.
 """
 
+import json
+import os
 import sys
 
 from docopt import docopt
 
 from arithgen import __version__
-from arithgen.generator import generate
+from arithgen.checkpoint import (
+    get_rng_state,
+    load_checkpoint,
+    save_checkpoint,
+    set_rng_state,
+)
+from arithgen.generator import ENGINES, expression_rng, generate
+from arithgen.stats import BatchStatistics
+
+
+def parse_shard(string):
+    """Parse a shard specification i/N into (i, N)."""
+    shard, _, num_shards = string.partition('/')
+    shard = int(shard)
+    num_shards = int(num_shards)
+    if not 0 <= shard < num_shards:
+        raise ValueError('Invalid shard {!r}'.format(string))
+    return shard, num_shards
+
+
+def shard_range(count, shard, num_shards):
+    """Return the range of expression indices of a shard."""
+    return range(count * shard // num_shards,
+                 count * (shard + 1) // num_shards)
+
+
+def _save_progress(filename, params, output, position, seed):
+    output.flush()
+    os.fsync(output.fileno())
+    save_checkpoint(filename, {
+        'params': params,
+        'position': position,
+        'offset': output.tell(),
+        # Seeded generation does not use the global random state
+        'rng_state': get_rng_state() if seed is None else None,
+    })
 
 
 def main(argv=None):
@@ -30,9 +93,79 @@ def main(argv=None):
     try:
         count = int(args['--count'])
         difficulty = int(args['--difficulty'])
+        seed = None
+        if args['--seed'] is not None:
+            seed = int(args['--seed'])
+        indices = range(count)
+        if args['--shard'] is not None:
+            if seed is None:
+                raise ValueError('--shard requires --seed')
+            indices = shard_range(count, *parse_shard(args['--shard']))
+        engine = args['--engine']
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine {!r}'.format(engine))
+        checkpoint_every = int(args['--checkpoint-every'])
+        if checkpoint_every <= 0:
+            raise ValueError('--checkpoint-every must be positive')
+        if args['--checkpoint'] is not None and args['--output'] is None:
+            raise ValueError('--checkpoint requires --output')
+        if args['--resume'] and args['--checkpoint'] is None:
+            raise ValueError('--resume requires --checkpoint')
+        if args['--analyze'] and args['--checkpoint'] is not None:
+            raise ValueError('--analyze does not support --checkpoint')
     except ValueError:
         print('Invalid arguments')
         return 1
-    for _ in range(count):
-        expr, result = generate(difficulty=difficulty)
-        print(args['--format'].format(expr=expr, result=result))
+    checkpoint = args['--checkpoint']
+    params = {
+        'count': count,
+        'difficulty': difficulty,
+        'engine': engine,
+        'format': args['--format'],
+        'seed': seed,
+        'shard': args['--shard'],
+    }
+    start = 0
+    try:
+        state = load_checkpoint(checkpoint) if args['--resume'] else None
+        if state is not None:
+            if state['params'] != params:
+                print('Checkpoint does not match arguments')
+                return 1
+            output = open(args['--output'], 'r+')
+            output.truncate(state['offset'])
+            output.seek(state['offset'])
+            if state['rng_state'] is not None:
+                set_rng_state(state['rng_state'])
+            start = state['position']
+        elif args['--output'] is not None:
+            output = open(args['--output'], 'w')
+        else:
+            output = sys.stdout
+    except (OSError, ValueError, KeyError) as e:
+        print('Cannot resume: {}'.format(e))
+        return 1
+    stats = BatchStatistics() if args['--analyze'] else None
+    try:
+        for position in range(start, len(indices)):
+            if checkpoint is not None and position % checkpoint_every == 0:
+                _save_progress(checkpoint, params, output, position, seed)
+            index = indices[position]
+            rng = expression_rng(seed, index) if seed is not None else None
+            if stats is not None:
+                gen = ENGINES[engine](difficulty, rng)
+                expr, result = gen.gen_expr()
+                stats.add(expr, result, gen.rejection_count)
+                continue
+            expr, result = generate(difficulty=difficulty, rng=rng,
+                                    engine=engine)
+            print(args['--format'].format(expr=expr, result=result,
+                                          index=index), file=output)
+        if stats is not None:
+            json.dump(stats.to_dict(), output, indent=2)
+            output.write('\n')
+        if checkpoint is not None:
+            _save_progress(checkpoint, params, output, len(indices), seed)
+    finally:
+        if output is not sys.stdout:
+            output.close()
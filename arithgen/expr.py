@@ -5,14 +5,41 @@ from fractions import Fraction
 
 
 class Expression(metaclass=ABCMeta):
-    """Base class for expressions."""
+    """Base class for expressions.
+
+    Expressions are immutable, so they can be shared between trees.
+    Subclasses set their attributes in __init__ with
+    object.__setattr__().
+    """
+
+    __slots__ = ('_name',)
 
     # Order of operation for binary operators, should be None for
     # anything else.
     level = None
 
     def __init__(self, *, name=None):
-        self.name = name
+        object.__setattr__(self, '_name', name)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def children(self):
+        """Tuple of the operand expressions."""
+        return ()
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('Expressions are immutable')
+
+    def __delattr__(self, attr):
+        raise AttributeError('Expressions are immutable')
+
+    def __setstate__(self, state):
+        # Used by pickle and copy, state is (None, slot values)
+        for attr, value in state[1].items():
+            object.__setattr__(self, attr, value)
 
     def __str__(self):
         return format(self, '')
@@ -42,9 +69,15 @@ class Expression(metaclass=ABCMeta):
 class Integer(Expression):
     """An integer."""
 
+    __slots__ = ('_num',)
+
     def __init__(self, num, *, name=None):
         super().__init__(name=name)
-        self._num = num
+        object.__setattr__(self, '_num', num)
+
+    @property
+    def value(self):
+        return self._num
 
     def to_string(self):
         return str(self._num)
@@ -56,28 +89,55 @@ class Integer(Expression):
         return Fraction(self._num)
 
 
+def needs_parentheses(parent, child, *, right):
+    """Check whether child needs parentheses as an operand of parent.
+
+    right tells whether child is the right operand. This is the rule
+    used for infix notation.
+    """
+    if child.level is None:
+        return False
+    if child.level < parent.level:
+        return True
+    return right and child.level == parent.level and parent.is_negative
+
+
 class BinaryExpression(Expression):
     """A binary expression."""
 
+    __slots__ = ('_oper', '_left', '_right')
+
     # Subtraction and division
     is_negative = False
 
     def __init__(self, oper, left, right, *, name=None):
         super().__init__(name=name)
-        self._oper = oper
-        self._left = left
-        self._right = right
+        object.__setattr__(self, '_oper', oper)
+        object.__setattr__(self, '_left', left)
+        object.__setattr__(self, '_right', right)
+
+    @property
+    def oper(self):
+        return self._oper
+
+    @property
+    def left(self):
+        return self._left
+
+    @property
+    def right(self):
+        return self._right
+
+    @property
+    def children(self):
+        return (self._left, self._right)
 
     def to_string(self):
         left_part = str(self._left)
-        if (self._left.level is not None and
-                self._left.level < self.level):
+        if needs_parentheses(self, self._left, right=False):
             left_part = '(' + left_part + ')'
         right_part = str(self._right)
-        if (self._right.level is not None and
-                (self._right.level < self.level or
-                 self._right.level == self.level and
-                 self.is_negative)):
+        if needs_parentheses(self, self._right, right=True):
             right_part = '(' + right_part + ')'
         return left_part + ' ' + str(self._oper) + ' ' + right_part
 
@@ -88,56 +148,163 @@ class BinaryExpression(Expression):
             right=self._right,
         )
 
-    @abstractmethod
     def evaluate(self):
-        """Return evaluated binary expression."""
+        return self.apply(self._left.evaluate(), self._right.evaluate())
+
+    @staticmethod
+    @abstractmethod
+    def apply(left, right):
+        """Return the operator applied to two evaluated operands."""
 
 
 class Addition(BinaryExpression):
     """a + b expressions."""
 
+    __slots__ = ()
+
     level = 1
 
     def __init__(self, left, right, *, name=None):
         super().__init__('+', left, right, name=name)
 
-    def evaluate(self):
-        return self._left.evaluate() + self._right.evaluate()
+    @staticmethod
+    def apply(left, right):
+        return left + right
 
 
 class Subtraction(BinaryExpression):
     """a - b expressions."""
 
+    __slots__ = ()
+
     level = 1
     is_negative = True
 
     def __init__(self, left, right, *, name=None):
         super().__init__('-', left, right, name=name)
 
-    def evaluate(self):
-        return self._left.evaluate() - self._right.evaluate()
+    @staticmethod
+    def apply(left, right):
+        return left - right
 
 
 class Multiplication(BinaryExpression):
     """a * b expressions."""
 
+    __slots__ = ()
+
     level = 2
 
     def __init__(self, left, right, *, name=None):
         super().__init__('*', left, right, name=name)
 
-    def evaluate(self):
-        return self._left.evaluate() * self._right.evaluate()
+    @staticmethod
+    def apply(left, right):
+        return left * right
 
 
 class Division(BinaryExpression):
     """a / b expressions."""
 
+    __slots__ = ()
+
     level = 2
     is_negative = True
 
     def __init__(self, left, right, *, name=None):
         super().__init__('/', left, right, name=name)
 
-    def evaluate(self):
-        return self._left.evaluate() / self._right.evaluate()
+    @staticmethod
+    def apply(left, right):
+        return left / right
+
+
+class ExpressionFactory:
+    """Create hash-consed expressions.
+
+    Structurally equal expressions created by one factory are the same
+    object, so a batch of trees becomes a DAG sharing common subtrees,
+    and equality can be checked with `is`. Values and infix strings are
+    computed at most once per node with evaluate() and to_string().
+
+    Nodes are kept alive as long as the factory. A factory must not be
+    shared between threads.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._values = {}
+        self._strings = {}
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def make(self, cls, *operands, name=None):
+        """Return cls(*operands, name=name), shared if possible.
+
+        operands are integers for Integer and expressions otherwise, the
+        children of the new expression. Expressions not created by this
+        factory are interned first.
+        """
+        if cls is not Integer:
+            operands = tuple(self.intern(operand) for operand in operands)
+            key = (cls, name) + tuple(id(operand) for operand in operands)
+        else:
+            key = (cls, name) + operands
+        node = self._nodes.get(key)
+        if node is None:
+            node = cls(*operands, name=name)
+            self._nodes[key] = node
+        return node
+
+    def integer(self, num, *, name=None):
+        return self.make(Integer, num, name=name)
+
+    def _owns(self, expr):
+        if isinstance(expr, Integer):
+            key = (Integer, expr.name, expr.value)
+        else:
+            key = ((type(expr), expr.name) +
+                   tuple(id(child) for child in expr.children))
+        return self._nodes.get(key) is expr
+
+    def intern(self, expr):
+        """Return the node of this factory equal to expr."""
+        if self._owns(expr):
+            return expr
+        if isinstance(expr, Integer):
+            return self.make(Integer, expr.value, name=expr.name)
+        return self.make(type(expr), *expr.children, name=expr.name)
+
+    def evaluate(self, expr):
+        """Return the memoized value of expr."""
+        expr = self.intern(expr)
+        value = self._values.get(id(expr))
+        if value is None:
+            if isinstance(expr, Integer):
+                value = expr.evaluate()
+            else:
+                value = expr.apply(*(self.evaluate(child)
+                                     for child in expr.children))
+            self._values[id(expr)] = value
+        return value
+
+    def to_string(self, expr):
+        """Return the memoized str(expr)."""
+        expr = self.intern(expr)
+        string = self._strings.get(id(expr))
+        if string is None:
+            if expr.name is not None:
+                string = expr.name
+            elif not isinstance(expr, BinaryExpression):
+                string = expr.to_string()
+            else:
+                left_part = self.to_string(expr.left)
+                if needs_parentheses(expr, expr.left, right=False):
+                    left_part = '(' + left_part + ')'
+                right_part = self.to_string(expr.right)
+                if needs_parentheses(expr, expr.right, right=True):
+                    right_part = '(' + right_part + ')'
+                string = left_part + ' ' + expr.oper + ' ' + right_part
+            self._strings[id(expr)] = string
+        return string
@@ -1,27 +1,39 @@
-"""Core of arithgen."""
-
+"""Core of arithgen.
+
+Generation is thread-safe as long as generator instances are not shared
+between threads: give each thread its own ExprGenerator (or call
+generate()) with its own random.Random instance. Tables shared between
+generators, such as the list of primes, are immutable.
+"""
+
+import bisect
+import concurrent.futures
+import functools
+import itertools
 import math
 import random
 from fractions import Fraction
 
 from arithgen import ntheory
-from arithgen.expr import (
-    Integer,
-    Addition,
-    Subtraction,
-    Multiplication,
-    Division,
+from arithgen.expr import Integer, Division
+from arithgen.operators import (
+    ADDITION,
+    SUBTRACTION,
+    MULTIPLICATION,
+    DIVISION,
+    OperatorRegistry,
+    default_registry,
 )
 
 
-def weighted_choice(choices):
+def weighted_choice(choices, rng=random):
     """Return a weighted random element from a non-empty sequence.
 
     choices is a sequence of two-element sequences. The first element of
     each sequence is the element and the second one is the weight.
     """
     total = sum(weight for element, weight in choices)
-    r = random.uniform(0, total)
+    r = rng.uniform(0, total)
     upto = 0
     for element, weight in choices:
         upto += weight
@@ -33,8 +45,9 @@ def weighted_choice(choices):
 class NumPrimeGenerator:
     """Generate numbers with only a given set of prime factors."""
 
-    def __init__(self, primes):
+    def __init__(self, primes, rng=None):
         self._primes = frozenset(primes)
+        self._rng = rng if rng is not None else random
 
     def is_valid(self, x, maxval=None):
         """Check whether x has only the given set of prime factors."""
@@ -61,7 +74,7 @@ class NumPrimeGenerator:
         vals = [1] * len(maxvals)
         while pr_choices:
             now = weighted_choice([(pr, math.log(pr) / pr)
-                                   for pr in pr_choices])
+                                   for pr in pr_choices], self._rng)
             if pr_used[now] is None:
                 pos_choices = [x for x in range(len(maxvals))
                                if vals[x] * now <= maxvals[x]]
@@ -69,7 +82,7 @@ class NumPrimeGenerator:
                     # The current prime will be removed anyway, give it
                     # an arbitrary index
                     pos_choices = [0]
-                pr_used[now] = random.choice(pos_choices)
+                pr_used[now] = self._rng.choice(pos_choices)
             x = pr_used[now]
             if vals[x] * now > maxvals[x]:
                 pr_choices.remove(now)
@@ -85,7 +98,7 @@ class NumPrimeGenerator:
         for _ in range(trials):
             x = self.gen_number(min(maxval, result))
             if self.is_valid(result - x, maxval):
-                if random.random() < 0.5:
+                if self._rng.random() < 0.5:
                     return x, result - x
                 else:
                     return result - x, x
@@ -105,18 +118,83 @@ class NumPrimeGenerator:
         return None
 
 
+@functools.lru_cache(maxsize=None)
+def _prime_table(count):
+    # Tuple of the first count primes, shared by all generators
+    primes = [2]
+    while len(primes) < count:
+        primes.append(ntheory.nextprime(primes[-1]))
+    return tuple(primes)
+
+
+@functools.lru_cache(maxsize=None)
+def _build_op_tables(operators):
+    # Map the level of the parent operator to the operators that can be
+    # chosen and their cumulative weights. Cached so that generators
+    # with the same operators share the tables.
+    tables = {}
+    levels = {None} | {oper.level for oper in operators}
+    for level in levels:
+        choices = [(oper, oper.weight(level))
+                   for oper in operators if oper.weight(level) > 0]
+        if not choices:
+            raise ValueError('No operator can be chosen')
+        opers, weights = zip(*choices)
+        tables[level] = (opers, tuple(itertools.accumulate(weights)))
+    return tables
+
+
+def _construct(cls, *operands):
+    return cls(*operands)
+
+
 class ExprGenerator:
-    def __init__(self, difficulty):
+    """Generate random expressions.
+
+    rng is a random.Random instance used for all random choices, the
+    global random module is used if it is None. An instance must not be
+    shared between threads.
+
+    If factory is an ExpressionFactory, expressions are created with it
+    and share equal subtrees.
+
+    operators is an OperatorRegistry, the default registry is used if it
+    is None. It is copied, and the tables used to choose operators are
+    built once per generator.
+
+    rejection_count counts the operators that had to be chosen again
+    because no operands could be generated for them. tree_depth is the
+    depth of the last expression generated by gen_expr(), where
+    fractions generated as leaves count as leaves.
+    """
+
+    def __init__(self, difficulty, rng=None, factory=None,
+                 operators=None):
         self._difficulty = difficulty
         self._maxval = 10 * 2 ** difficulty
+        self._rng = rng if rng is not None else random
+        self._make = factory.make if factory is not None else _construct
+        if operators is None:
+            operators = default_registry
+        self._operators = OperatorRegistry(operators)
+        self._op_tables = _build_op_tables(tuple(self._operators))
         self._numgen = None
+        self.rejection_count = 0
+        self.tree_depth = 0
+
+    def choose_operator(self, parent_level=None):
+        """Choose a random operator below an operator of parent_level."""
+        opers, cum_weights = self._op_tables[parent_level]
+        r = self._rng.uniform(0, cum_weights[-1])
+        return opers[bisect.bisect_left(cum_weights, r)]
 
     def _gen_primes(self):
         primecnt = 2 + int(1.5 * self._difficulty)
-        prime_ind = [1] + random.sample(range(2, int(1.5 * primecnt)),
-                                        primecnt - 1)
-        primes = [ntheory.prime(i) for i in prime_ind]
-        self._numgen = NumPrimeGenerator(primes)
+        prime_ind = [1] + self._rng.sample(range(2, int(1.5 * primecnt)),
+                                           primecnt - 1)
+        table = _prime_table(max(prime_ind))
+        primes = [table[i - 1] for i in prime_ind]
+        self._numgen = NumPrimeGenerator(primes, self._rng)
 
     def _ending_prob(self, depth):
         # Probability table:
@@ -133,106 +211,238 @@ class ExprGenerator:
             return [0.8, 0.5, 0.2][self._difficulty % 3]
         return 0.9
 
-    def _gen_division_operand(self, result):
-        left = result.numerator
-        right = result.denominator
-        numerator, denominator = self._numgen.gen_coprime_numbers(
-            self._maxval // max(left, right), self._maxval)
-        mult_frac = Fraction(numerator, denominator)
-        left *= mult_frac
-        right *= mult_frac
-        return left, right
-
-    @property
-    def op_gen_methods(self):
-        return [
-            self.gen_addition_with_result,
-            self.gen_subtraction_with_result,
-            self.gen_multiplication_with_result,
-            self.gen_division_with_result,
-        ]
-
     def gen_fraction(self):
         """Generate a random fraction."""
         numerator, denominator = self._numgen.gen_coprime_numbers(
             self._maxval, self._maxval)
         return Fraction(numerator, denominator)
 
+    def gen_leaf(self, result):
+        """Generate an integer or a fraction with given value."""
+        if result.denominator == 1:
+            return self._make(Integer, result.numerator)
+        return self._make(
+            Division,
+            self._make(Integer, result.numerator),
+            self._make(Integer, result.denominator),
+        )
+
+    def gen_operator_with_result(self, oper, result, depth=0):
+        """Generate an expression using oper with given result.
+
+        Return None if generation failed.
+        """
+        operands = oper.gen_operands(self._numgen, self._maxval, result)
+        if operands is None:
+            return None
+        return self._make(oper.expr_class, *[
+            self.gen_expr_with_result(operand, depth + 1, oper.level)
+            for operand in operands])
+
     def gen_addition_with_result(self, result, depth=0):
         """Generate a, b with a + b = result.
 
         Return None if generation failed.
         """
-        pair = self._numgen.gen_numbers_with_sum(
-            self._maxval, result.numerator)
-        if not pair:
-            return None
-        left = Fraction(pair[0], result.denominator)
-        right = Fraction(pair[1], result.denominator)
-        return Addition(
-            self.gen_expr_with_result(left, depth + 1, [1, 1, 2, 2]),
-            self.gen_expr_with_result(right, depth + 1, [1, 1, 2, 2]),
-        )
+        return self.gen_operator_with_result(ADDITION, result, depth)
 
     def gen_subtraction_with_result(self, result, depth=0):
         """Generate a, b with a - b = result.
 
         Return None if generation failed.
         """
-        pair = self._numgen.gen_numbers_with_difference(
-            self._maxval, result.numerator)
-        if not pair:
-            return None
-        left = Fraction(pair[0], result.denominator)
-        right = Fraction(pair[1], result.denominator)
-        return Subtraction(
-            self.gen_expr_with_result(left, depth + 1, [1, 1, 2, 2]),
-            self.gen_expr_with_result(right, depth + 1, [1, 1, 2, 2]),
-        )
+        return self.gen_operator_with_result(SUBTRACTION, result, depth)
 
     def gen_multiplication_with_result(self, result, depth=0):
         """Generate a, b with a * b = result."""
-        left, right = self._gen_division_operand(result)
-        right = 1 / right
-        return Multiplication(
-            self.gen_expr_with_result(left, depth + 1, [2, 2, 1, 1]),
-            self.gen_expr_with_result(right, depth + 1, [2, 2, 1, 1]),
-        )
+        return self.gen_operator_with_result(MULTIPLICATION, result, depth)
 
     def gen_division_with_result(self, result, depth=0):
         """Generate a, b with a / b = result."""
-        left, right = self._gen_division_operand(result)
-        return Division(
-            self.gen_expr_with_result(left, depth + 1, [2, 2, 1, 1]),
-            self.gen_expr_with_result(right, depth + 1, [2, 2, 1, 1]),
-        )
+        return self.gen_operator_with_result(DIVISION, result, depth)
 
-    def gen_expr_with_result(self, result, depth=0, op_weight=None):
-        """Generate a random expression with given result."""
-        if op_weight is None:
-            op_weight = [1, 1, 1, 1]
-        if random.random() < self._ending_prob(depth):
-            if result.denominator == 1:
-                return Integer(result.numerator)
-            return Division(
-                Integer(result.numerator),
-                Integer(result.denominator),
-            )
+    def gen_expr_with_result(self, result, depth=0, parent_level=None):
+        """Generate a random expression with given result.
+
+        parent_level is the level of the operator above the expression,
+        or None at the top.
+        """
+        if self._rng.random() < self._ending_prob(depth):
+            self.tree_depth = max(self.tree_depth, depth)
+            return self.gen_leaf(result)
         ans = None
         while ans is None:
-            meth = weighted_choice(list(zip(self.op_gen_methods,
-                                            op_weight)))
-            ans = meth(result, depth)
+            oper = self.choose_operator(parent_level)
+            ans = self.gen_operator_with_result(oper, result, depth)
+            if ans is None:
+                self.rejection_count += 1
         return ans
 
     def gen_expr(self):
         """Generate a random expression and the result."""
         self._gen_primes()
+        self.tree_depth = 0
         result = self.gen_fraction()
         return self.gen_expr_with_result(result), result
 
 
-def generate(*, difficulty):
-    """Generate a arithmetic expression."""
-    gen = ExprGenerator(difficulty)
+class ShapeFirstGenerator(ExprGenerator):
+    """Generate random expressions by sampling the tree shape first.
+
+    A skeleton of operators is sampled with the same ending
+    probabilities and operator weights as ExprGenerator, then values are
+    assigned top-down in a single pass. An operator whose is_feasible
+    check fails for the value, or whose operands cannot be generated, is
+    drawn again from the same weights, restricted to the operators
+    feasible for the value. This gives expressions the same distribution
+    as ExprGenerator without backtracking.
+    """
+
+    def __init__(self, difficulty, rng=None, factory=None,
+                 operators=None):
+        super().__init__(difficulty, rng, factory, operators)
+        # The ending probability is constant from min_depth + 1 on
+        depth = 0
+        self._ending_probs = []
+        while depth <= self._difficulty // 3 + 2:
+            self._ending_probs.append(self._ending_prob(depth))
+            depth += 1
+
+    def gen_skeleton(self, depth=0, parent_level=None):
+        """Generate a random tree shape.
+
+        A skeleton is None for a leaf, or a tuple (operator, *children)
+        where operator is an Operator and children are the skeletons of
+        its operands.
+        """
+        ending_prob = self._ending_probs[min(depth,
+                                             len(self._ending_probs) - 1)]
+        if self._rng.random() < ending_prob:
+            return None
+        oper = self.choose_operator(parent_level)
+        return (oper,) + tuple(self.gen_skeleton(depth + 1, oper.level)
+                               for _ in range(oper.arity))
+
+    def _is_feasible(self, oper, result):
+        return oper.is_feasible is None or oper.is_feasible(self._maxval,
+                                                            result)
+
+    def choose_feasible_operator(self, result, parent_level=None):
+        """Choose a random operator feasible for result.
+
+        The weights are those of choose_operator(), so this is the
+        operator choose_operator() gives after rejecting infeasible
+        ones.
+        """
+        opers, cum_weights = self._op_tables[parent_level]
+        feasible = []
+        feasible_cum_weights = []
+        total = 0
+        previous = 0
+        for oper, cum_weight in zip(opers, cum_weights):
+            if self._is_feasible(oper, result):
+                total += cum_weight - previous
+                feasible.append(oper)
+                feasible_cum_weights.append(total)
+            previous = cum_weight
+        if not feasible:
+            raise RuntimeError(
+                'No operator is feasible for {}'.format(result))
+        r = self._rng.uniform(0, total)
+        return feasible[bisect.bisect_left(feasible_cum_weights, r)]
+
+    def fill_skeleton(self, skeleton, result, depth=0, parent_level=None):
+        """Generate an expression with given shape and result.
+
+        depth and parent_level must be those the skeleton was generated
+        with.
+        """
+        return self._fill(skeleton, result, depth, parent_level,
+                          parent_level)
+
+    def _fill(self, skeleton, result, depth, parent_level, skeleton_level):
+        # skeleton_level is the parent level the operator of skeleton
+        # was chosen with. If the parent operator was replaced by one
+        # of another level, the weights differ and the operator is
+        # chosen again.
+        if skeleton is None:
+            self.tree_depth = max(self.tree_depth, depth)
+            return self.gen_leaf(result)
+        oper = skeleton[0]
+        if (skeleton_level != parent_level or
+                not self._is_feasible(oper, result)):
+            if skeleton_level == parent_level:
+                self.rejection_count += 1
+            oper = self.choose_feasible_operator(result, parent_level)
+        while True:
+            operands = oper.gen_operands(self._numgen, self._maxval,
+                                         result)
+            if operands is not None:
+                break
+            self.rejection_count += 1
+            oper = self.choose_feasible_operator(result, parent_level)
+        children = skeleton[1:]
+        if len(children) != oper.arity:
+            # Shapes of subtrees are independent, so extra ones can be
+            # dropped and missing ones generated now
+            children = children[:oper.arity] + tuple(
+                self.gen_skeleton(depth + 1, skeleton[0].level)
+                for _ in range(oper.arity - len(children)))
+        return self._make(oper.expr_class, *[
+            self._fill(child, operand, depth + 1, oper.level,
+                       skeleton[0].level)
+            for child, operand in zip(children, operands)])
+
+    def gen_expr_with_result(self, result, depth=0, parent_level=None):
+        """Generate a random expression with given result."""
+        return self.fill_skeleton(self.gen_skeleton(depth, parent_level),
+                                  result, depth, parent_level)
+
+
+ENGINES = {
+    'recursive': ExprGenerator,
+    'shape': ShapeFirstGenerator,
+}
+
+
+def generate(*, difficulty, rng=None, engine='recursive', factory=None):
+    """Generate a arithmetic expression.
+
+    engine is a key of ENGINES selecting the generator class.
+    """
+    gen = ENGINES[engine](difficulty, rng, factory)
     return gen.gen_expr()
+
+
+def expression_rng(seed, index):
+    """Return the random.Random instance for expression index of seed.
+
+    Each expression of a seeded batch has its own random stream, so it
+    can be regenerated from the seed and its index alone.
+    """
+    return random.Random('{}:{}'.format(seed, index))
+
+
+def _generate_range(difficulty, engine, seed, start, stop):
+    return [generate(difficulty=difficulty,
+                     rng=expression_rng(seed, index), engine=engine)
+            for index in range(start, stop)]
+
+
+def generate_batch(count, *, difficulty, seed=None, start=0, workers=None,
+                   chunksize=64, engine='recursive'):
+    """Generate a list of count (expr, result) pairs using threads.
+
+    The expressions have indices start, start + 1, ... and the result
+    only depends on seed and the indices, not on the number of workers.
+    A random seed is chosen if seed is None.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    bounds = range(start, start + count, chunksize)
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        chunks = executor.map(
+            lambda lo: _generate_range(difficulty, engine, seed, lo,
+                                       min(lo + chunksize, start + count)),
+            bounds)
+        return [pair for chunk in chunks for pair in chunk]
@@ -0,0 +1,235 @@
+"""Batch grading of answer sheets.
+
+Usage:
+    arithgen-grade [options] [<file>...]
+    arithgen-grade --help
+    arithgen-grade --version
+
+Each input line is a record of the form <question><TAB><answer>. The
+question is either an expression as printed by arithgen, or an id
+looked up in the answer key. Reads standard input if no file is given.
+One verdict line <question><TAB><answer><TAB><verdict><TAB><result> is
+written per record, where verdict is one of correct, wrong, invalid
+(the answer cannot be parsed) and unknown (the question cannot be
+resolved).
+
+Options:
+    -k, --key=<file>      Answer key with lines of the form
+                          <id><TAB><result>. Without a key, questions
+                          are parsed as expressions and evaluated.
+    -r, --strict          Only accept answer with an integer or a
+                          fraction in the form of a/b with
+                          gcd(a, b) == 1 and b > 1, as in
+                          arithgen-quiz --strict.
+    -j, --jobs=<jobs>     Number of worker processes. [default: 1]
+    -o, --output=<file>   Write verdicts to a file instead of standard
+                          output.
+    -s, --silent          Suppress summary information output.
+"""
+
+import collections
+import fileinput
+import itertools
+import multiprocessing
+import sys
+from fractions import Fraction
+
+from docopt import docopt
+
+from arithgen import __version__
+from arithgen.parser import parse_infix
+from arithgen.quiz import get_fraction_parser
+
+
+CORRECT = 'correct'
+WRONG = 'wrong'
+INVALID = 'invalid'
+UNKNOWN = 'unknown'
+
+Verdict = collections.namedtuple(
+    'Verdict', ['question', 'answer', 'status', 'result'])
+
+
+class Grader:
+    """Grade answers against an answer key or recomputed results.
+
+    key is a mapping from question ids to results. If it is None,
+    questions are parsed as expressions and evaluated instead.
+    """
+
+    def __init__(self, *, key=None, strict=False):
+        self._key = key
+        self._parse_answer = get_fraction_parser(strict=strict)
+
+    def get_result(self, question):
+        """Return the result of the question, or None if unknown."""
+        if self._key is not None:
+            return self._key.get(question)
+        try:
+            return parse_infix(question).evaluate()
+        except (ValueError, ZeroDivisionError):
+            return None
+
+    def grade(self, question, answer):
+        """Grade a single answer and return a Verdict."""
+        result = self.get_result(question)
+        if result is None:
+            return Verdict(question, answer, UNKNOWN, None)
+        try:
+            user_result = self._parse_answer(answer.strip())
+        except (ValueError, ZeroDivisionError):
+            return Verdict(question, answer, INVALID, result)
+        status = CORRECT if user_result == result else WRONG
+        return Verdict(question, answer, status, result)
+
+
+class GradeSummary:
+    """Aggregate statistics over verdicts."""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    def add(self, verdict):
+        self.counts[verdict.status] += 1
+
+    @property
+    def correct_count(self):
+        return self.counts[CORRECT]
+
+    @property
+    def total_count(self):
+        return sum(self.counts.values())
+
+    @property
+    def correct_rate(self):
+        if not self.total_count:
+            return 0.0
+        return self.correct_count / self.total_count
+
+
+def read_records(lines):
+    """Yield (question, answer) pairs from lines of records.
+
+    Lines without a TAB are yielded with an empty answer.
+    """
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        question, _, answer = line.rpartition('\t')
+        if not question:
+            question, answer = answer, ''
+        yield question, answer
+
+
+def read_key(lines):
+    """Return an answer key dict from lines of <id><TAB><result>."""
+    key = {}
+    for question, result in read_records(lines):
+        key[question] = Fraction(result)
+    return key
+
+
+_worker_grader = None
+
+
+def _init_worker(key, strict):
+    global _worker_grader
+    _worker_grader = Grader(key=key, strict=strict)
+
+
+def _grade_chunk_in_worker(chunk):
+    return [_worker_grader.grade(*record) for record in chunk]
+
+
+def grade_records(records, *, key=None, strict=False, jobs=1,
+                  chunksize=1000, max_pending=None):
+    """Grade (question, answer) records and yield Verdicts in order.
+
+    Records are consumed lazily. If jobs is greater than 1, grading is
+    spread over a pool of worker processes in chunks of chunksize
+    records. At most max_pending chunks, by default 2 * jobs, are read
+    ahead of the verdicts yielded.
+    """
+    if jobs <= 1:
+        grader = Grader(key=key, strict=strict)
+        for question, answer in records:
+            yield grader.grade(question, answer)
+        return
+    if max_pending is None:
+        max_pending = 2 * jobs
+    records = iter(records)
+    pending = collections.deque()
+    with multiprocessing.Pool(jobs, _init_worker,
+                              (key, strict)) as pool:
+        while True:
+            # Pool.imap would read all records ahead, so chunks are
+            # submitted only as earlier ones are consumed
+            while len(pending) < max_pending:
+                chunk = list(itertools.islice(records, chunksize))
+                if not chunk:
+                    break
+                pending.append(pool.apply_async(_grade_chunk_in_worker,
+                                                (chunk,)))
+            if not pending:
+                return
+            yield from pending.popleft().get()
+
+
+def format_verdict(verdict):
+    result = '' if verdict.result is None else str(verdict.result)
+    return '\t'.join([verdict.question, verdict.answer,
+                      verdict.status, result])
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = docopt(__doc__, argv=argv,
+                  version='arithgen ' + __version__)
+    try:
+        jobs = int(args['--jobs'])
+    except ValueError:
+        print('Invalid arguments')
+        return 1
+    key = None
+    if args['--key'] is not None:
+        try:
+            with open(args['--key'], 'r') as f:
+                key = read_key(f)
+        except OSError as e:
+            print('Cannot read answer key: {}'.format(e))
+            return 1
+        except (ValueError, ZeroDivisionError):
+            print('Invalid answer key')
+            return 1
+    output = sys.stdout
+    if args['--output'] is not None:
+        try:
+            output = open(args['--output'], 'w')
+        except OSError as e:
+            print('Cannot open output file: {}'.format(e))
+            return 1
+    summary = GradeSummary()
+    try:
+        with fileinput.input(args['<file>']) as lines:
+            for verdict in grade_records(read_records(lines), key=key,
+                                         strict=args['--strict'],
+                                         jobs=jobs):
+                summary.add(verdict)
+                output.write(format_verdict(verdict) + '\n')
+    except OSError as e:
+        print('Cannot read input: {}'.format(e))
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if not args['--silent'] and summary.total_count:
+        print('Correct rate: {}/{} ({:.2f}%), invalid: {}, '
+              'unknown: {}'.format(
+                  summary.correct_count,
+                  summary.total_count,
+                  summary.correct_rate * 100,
+                  summary.counts[INVALID],
+                  summary.counts[UNKNOWN],
+              ), file=sys.stderr)
@@ -0,0 +1,91 @@
+"""Merge the outputs of sharded arithgen runs.
+
+Usage:
+    arithgen-merge [options] <file>...
+    arithgen-merge --help
+    arithgen-merge --version
+
+Each line of the input files must start with the expression index
+followed by whitespace, e.g. generated with -F '{index} {expr}'. Every
+file must be sorted by index, as arithgen outputs are. The files are
+merged by index in constant memory.
+
+With --stats, the files are JSON statistics output by arithgen
+--analyze, and the combined statistics are written.
+
+Options:
+    -o, --output=<file>  Write to a file instead of standard output.
+    --strip-index        Remove the index from the merged lines.
+    --stats              Merge statistics instead of expressions.
+"""
+
+import contextlib
+import heapq
+import json
+import sys
+
+from docopt import docopt
+
+from arithgen import __version__
+from arithgen.stats import BatchStatistics
+
+
+def line_index(line):
+    """Return the index at the start of a line."""
+    return int(line.split(None, 1)[0])
+
+
+def merge_lines(*iterables):
+    """Merge sorted iterables of lines by index.
+
+    Raise ValueError if an index appears more than once or a line does
+    not start with an index.
+    """
+    last = None
+    for index, line in heapq.merge(
+            *[((line_index(line), line) for line in lines)
+              for lines in iterables],
+            key=lambda item: item[0]):
+        if last is not None and index <= last:
+            raise ValueError('Duplicate or unsorted index {}'.format(index))
+        last = index
+        yield line
+
+
+def merge_stats(files, output):
+    """Combine JSON statistics from files and write them to output."""
+    stats = BatchStatistics()
+    for f in files:
+        stats.merge(BatchStatistics.from_dict(json.load(f)))
+    json.dump(stats.to_dict(), output, indent=2)
+    output.write('\n')
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = docopt(__doc__, argv=argv,
+                  version='arithgen ' + __version__)
+    with contextlib.ExitStack() as stack:
+        try:
+            files = [stack.enter_context(open(filename, 'r'))
+                     for filename in args['<file>']]
+            output = sys.stdout
+            if args['--output'] is not None:
+                output = stack.enter_context(open(args['--output'], 'w'))
+        except OSError as e:
+            print('Cannot open file: {}'.format(e))
+            return 1
+        try:
+            if args['--stats']:
+                merge_stats(files, output)
+            else:
+                for line in merge_lines(*files):
+                    if not line.endswith('\n'):
+                        line += '\n'
+                    if args['--strip-index']:
+                        line = line.split(None, 1)[1]
+                    output.write(line)
+        except (ValueError, IndexError, KeyError) as e:
+            print('Invalid input: {}'.format(e), file=sys.stderr)
+            return 1
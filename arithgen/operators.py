@@ -0,0 +1,176 @@
+"""Registry of operators used by the generators.
+
+Each operator supplies its expression class, a function generating
+operand values for a given result, and weights used to choose it. New
+operators can be registered without changing the generators.
+"""
+
+import types
+from fractions import Fraction
+
+from arithgen.expr import Addition, Subtraction, Multiplication, Division
+
+
+class Operator:
+    """An operator the generators can use.
+
+    name is a unique name of the operator. expr_class is the expression
+    class, constructed as expr_class(*children) with arity children. It
+    must define level, children and a static apply(*values) like
+    BinaryExpression.
+
+    gen_operands(numgen, maxval, result) returns a tuple of arity
+    operand values such that applying the operator gives result, or None
+    if generation failed. numgen is a NumPrimeGenerator and maxval the
+    largest number to use.
+
+    weights maps the level of the parent operator, or None at the top
+    of the expression, to the weight of choosing this operator.
+    default_weight is used for levels not in weights. Both are read-only,
+    since generators cache tables built from them.
+
+    is_feasible(maxval, result), if given, is a cheap check returning
+    False if gen_operands is known to fail for result.
+    """
+
+    def __init__(self, name, expr_class, gen_operands, *, arity=2,
+                 weights=None, default_weight=1, is_feasible=None):
+        self.name = name
+        self.expr_class = expr_class
+        self.gen_operands = gen_operands
+        self.arity = arity
+        self._weights = types.MappingProxyType(dict(weights or {}))
+        self._default_weight = default_weight
+        self.is_feasible = is_feasible
+
+    @property
+    def level(self):
+        return self.expr_class.level
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @property
+    def default_weight(self):
+        return self._default_weight
+
+    def __getstate__(self):
+        # MappingProxyType cannot be pickled
+        state = self.__dict__.copy()
+        state['_weights'] = dict(self._weights)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._weights = types.MappingProxyType(self._weights)
+
+    def weight(self, parent_level):
+        """Return the weight of this operator below parent_level."""
+        return self._weights.get(parent_level, self._default_weight)
+
+    def __repr__(self):
+        return '<Operator {!r}>'.format(self.name)
+
+
+class OperatorRegistry:
+    """An ordered collection of operators, looked up by name."""
+
+    def __init__(self, operators=()):
+        self._operators = {}
+        for oper in operators:
+            self.register(oper)
+
+    def register(self, oper):
+        """Add an operator, replacing any operator of the same name."""
+        self._operators[oper.name] = oper
+
+    def unregister(self, name):
+        del self._operators[name]
+
+    def __getitem__(self, name):
+        return self._operators[name]
+
+    def __contains__(self, name):
+        return name in self._operators
+
+    def __iter__(self):
+        return iter(self._operators.values())
+
+    def __len__(self):
+        return len(self._operators)
+
+    def copy(self):
+        return OperatorRegistry(self)
+
+
+def _sum_operands(numgen, maxval, result):
+    pair = numgen.gen_numbers_with_sum(maxval, result.numerator)
+    if not pair:
+        return None
+    return (Fraction(pair[0], result.denominator),
+            Fraction(pair[1], result.denominator))
+
+
+def _difference_operands(numgen, maxval, result):
+    pair = numgen.gen_numbers_with_difference(maxval, result.numerator)
+    if not pair:
+        return None
+    return (Fraction(pair[0], result.denominator),
+            Fraction(pair[1], result.denominator))
+
+
+def _quotient_operands(numgen, maxval, result):
+    left = result.numerator
+    right = result.denominator
+    numerator, denominator = numgen.gen_coprime_numbers(
+        maxval // max(left, right), maxval)
+    mult_frac = Fraction(numerator, denominator)
+    return left * mult_frac, right * mult_frac
+
+
+def _product_operands(numgen, maxval, result):
+    left, right = _quotient_operands(numgen, maxval, result)
+    return left, 1 / right
+
+
+# Both operands of sums and differences are integers between 1 and
+# maxval over the denominator of result
+def _sum_is_feasible(maxval, result):
+    return 2 <= result.numerator <= 2 * maxval
+
+
+def _difference_is_feasible(maxval, result):
+    return result.numerator < maxval
+
+
+ADDITION = Operator(
+    'addition', Addition, _sum_operands,
+    weights={None: 1, 1: 1, 2: 2},
+    is_feasible=_sum_is_feasible,
+)
+SUBTRACTION = Operator(
+    'subtraction', Subtraction, _difference_operands,
+    weights={None: 1, 1: 1, 2: 2},
+    is_feasible=_difference_is_feasible,
+)
+MULTIPLICATION = Operator(
+    'multiplication', Multiplication, _product_operands,
+    weights={None: 1, 1: 2, 2: 1},
+)
+DIVISION = Operator(
+    'division', Division, _quotient_operands,
+    weights={None: 1, 1: 2, 2: 1},
+)
+
+default_registry = OperatorRegistry([
+    ADDITION,
+    SUBTRACTION,
+    MULTIPLICATION,
+    DIVISION,
+])
+
+
+def register_operator(oper):
+    """Add an operator to the default registry."""
+    default_registry.register(oper)
@@ -0,0 +1,93 @@
+"""Parse expressions printed by arithgen back into expression trees.
+
+Only the infix notation produced by Expression.to_string() is supported:
+non-negative integers, the four binary operators and parentheses.
+"""
+
+import re
+
+from arithgen.expr import (
+    Integer,
+    Addition,
+    Subtraction,
+    Multiplication,
+    Division,
+)
+
+
+_TOKEN_RE = re.compile(r'\s*(?:([0-9]+)|(.))')
+
+_OPERATORS = {
+    '+': Addition,
+    '-': Subtraction,
+    '*': Multiplication,
+    '/': Division,
+}
+
+
+def _tokenize(string):
+    tokens = []
+    for match in _TOKEN_RE.finditer(string.rstrip()):
+        number, symbol = match.groups()
+        if number is not None:
+            tokens.append(int(number))
+        elif symbol in _OPERATORS or symbol in '()':
+            tokens.append(symbol)
+        else:
+            raise ValueError('Unexpected character {!r}'.format(symbol))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self._tokens = tokens
+        self._pos = 0
+
+    def _peek(self):
+        if self._pos < len(self._tokens):
+            return self._tokens[self._pos]
+        return None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError('Unexpected end of expression')
+        self._pos += 1
+        return token
+
+    def parse(self):
+        ans = self._parse_level(1)
+        if self._peek() is not None:
+            raise ValueError('Unexpected token {!r}'.format(self._peek()))
+        return ans
+
+    def _parse_level(self, level):
+        if level > 2:
+            return self._parse_atom()
+        ans = self._parse_level(level + 1)
+        while True:
+            token = self._peek()
+            cls = _OPERATORS.get(token) if isinstance(token, str) else None
+            if cls is None or cls.level != level:
+                return ans
+            self._pos += 1
+            ans = cls(ans, self._parse_level(level + 1))
+
+    def _parse_atom(self):
+        token = self._next()
+        if isinstance(token, int):
+            return Integer(token)
+        if token == '(':
+            ans = self._parse_level(1)
+            if self._next() != ')':
+                raise ValueError('Unbalanced parentheses')
+            return ans
+        raise ValueError('Unexpected token {!r}'.format(token))
+
+
+def parse_infix(string):
+    """Parse an infix expression string into an Expression.
+
+    Raise ValueError if the string is not a valid expression.
+    """
+    return _Parser(_tokenize(string)).parse()
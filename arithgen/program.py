@@ -0,0 +1,203 @@
+"""Compile expressions into programs for repeated evaluation.
+
+Named nodes of an expression become variables of the program, so one
+template expression can be evaluated for many bindings without walking
+the tree again. A program is a list of postfix instructions, and is also
+compiled into a Python function.
+"""
+
+from fractions import Fraction
+
+from arithgen.expr import (
+    Addition, Subtraction, Multiplication, Division, Integer,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Opcodes of postfix instructions. CONST pushes its argument, VAR pushes
+# the variable of its argument index, APPLY pops two operands and pushes
+# its argument applied to them.
+CONST = 'const'
+VAR = 'var'
+APPLY = 'apply'
+
+# Python operators of expression classes, used in generated functions
+_PYTHON_OPERATORS = {
+    Addition: '+',
+    Subtraction: '-',
+    Multiplication: '*',
+    Division: '/',
+}
+
+
+class Program:
+    """A compiled expression.
+
+    variables is a tuple of variable names, in the order of positional
+    arguments. defaults maps names to the values of the named nodes in
+    the original expression, used for unbound variables. code is the
+    list of postfix instructions (opcode, argument), and function the
+    compiled Python function taking the variables as positional
+    arguments. function expects Fraction values, since dividing ints
+    gives a float; the other methods convert their arguments.
+    """
+
+    def __init__(self, variables, defaults, code, function, source):
+        self.variables = variables
+        self.defaults = defaults
+        self.code = code
+        self.function = function
+        self.source = source
+
+    def _arguments(self, args, bindings):
+        if len(args) > len(self.variables):
+            raise TypeError('Too many arguments')
+        values = [Fraction(arg) for arg in args]
+        for name in self.variables[len(args):]:
+            values.append(Fraction(bindings.pop(name, self.defaults[name])))
+        if bindings:
+            raise TypeError('Unknown variable {!r}'.format(
+                next(iter(bindings))))
+        return values
+
+    def __call__(self, *args, **bindings):
+        """Evaluate with the compiled function.
+
+        Variables are given positionally or by name.
+        """
+        return self.function(*self._arguments(args, bindings))
+
+    def run(self, *args, **bindings):
+        """Evaluate by interpreting the postfix instructions."""
+        values = self._arguments(args, bindings)
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for opcode, arg in self.code:
+            if opcode is CONST:
+                push(arg)
+            elif opcode is VAR:
+                push(values[arg])
+            else:
+                right = pop()
+                push(arg(pop(), right))
+        return stack[0]
+
+    def evaluate_many(self, rows):
+        """Return a list of results, one for each tuple of variables."""
+        function = self.function
+        return [function(*map(Fraction, row)) for row in rows]
+
+    def evaluate_arrays(self, *columns):
+        """Evaluate elementwise over NumPy arrays, one per variable.
+
+        Integer arrays are converted to Fraction, so results are exact
+        object arrays. Requires NumPy.
+        """
+        if numpy is None:
+            raise RuntimeError('NumPy is required for evaluate_arrays')
+        to_fraction = numpy.frompyfunc(Fraction, 1, 1)
+        arrays = []
+        for column in columns:
+            array = numpy.asarray(column)
+            if array.dtype != object:
+                array = to_fraction(array)
+            arrays.append(array)
+        return numpy.asarray(self.function(*arrays), dtype=object)
+
+
+def compile_expression(expr, variables=None):
+    """Compile an expression into a Program.
+
+    Every named node is replaced by the variable of its name. variables
+    gives the order of variables, by default the order of first use from
+    left to right. Subtrees without variables are evaluated when
+    compiling, and identical subtrees, such as those shared by an
+    ExpressionFactory, are computed once by the compiled function.
+    """
+    defaults = {}
+    code = []
+    _emit(expr, code, defaults)
+    if variables is None:
+        variables = tuple(defaults)
+    else:
+        variables = tuple(variables)
+        unknown = set(variables) - set(defaults)
+        if unknown:
+            raise ValueError('Unknown variables {!r}'.format(
+                sorted(unknown)))
+        missing = set(defaults) - set(variables)
+        if missing:
+            raise ValueError('Missing variables {!r}'.format(
+                sorted(missing)))
+    indices = {name: index for index, name in enumerate(variables)}
+    code = [(VAR, indices[arg]) if opcode is VAR else (opcode, arg)
+            for opcode, arg in code]
+    source, namespace = _generate_source(code, len(variables))
+    exec(compile(source, '<arithgen program>', 'exec'), namespace)
+    return Program(variables, defaults, code, namespace['program'], source)
+
+
+def _emit(expr, code, defaults):
+    if expr.name is not None:
+        defaults.setdefault(expr.name, expr.evaluate())
+        # Resolved to an index once all variables are known
+        code.append((VAR, expr.name))
+    elif isinstance(expr, Integer):
+        code.append((CONST, Fraction(expr.value)))
+    else:
+        _emit(expr.left, code, defaults)
+        _emit(expr.right, code, defaults)
+        # An operand compiles to a single CONST only if it has no
+        # variables, so the whole subtree can be folded
+        if code[-2][0] is CONST and code[-1][0] is CONST:
+            right = code.pop()[1]
+            left = code.pop()[1]
+            code.append((CONST, expr.apply(left, right)))
+        else:
+            code.append((APPLY, type(expr).apply))
+
+
+def _generate_source(code, variable_count):
+    # Each instruction gets one temporary; instructions computing a
+    # value already computed reuse its temporary instead
+    namespace = {}
+    lines = []
+    stack = []
+    known = {}
+    constants = {}
+    functions = {}
+    classes = {cls.apply: cls for cls in _PYTHON_OPERATORS}
+    for opcode, arg in code:
+        if opcode is VAR:
+            stack.append('v{}'.format(arg))
+            continue
+        if opcode is CONST:
+            if arg not in constants:
+                constants[arg] = 'c{}'.format(len(constants))
+                namespace[constants[arg]] = arg
+            stack.append(constants[arg])
+            continue
+        right = stack.pop()
+        left = stack.pop()
+        cls = classes.get(arg)
+        if cls is not None:
+            value = '{} {} {}'.format(left, _PYTHON_OPERATORS[cls], right)
+        else:
+            if arg not in functions:
+                functions[arg] = 'f{}'.format(len(functions))
+                namespace[functions[arg]] = arg
+            value = '{}({}, {})'.format(functions[arg], left, right)
+        if value not in known:
+            known[value] = 't{}'.format(len(known))
+            lines.append('    {} = {}'.format(known[value], value))
+        stack.append(known[value])
+    params = ', '.join('v{}'.format(index)
+                       for index in range(variable_count))
+    lines.append('    return {}'.format(stack[0]))
+    source = 'def program({}):\n{}\n'.format(params, '\n'.join(lines))
+    return source, namespace
@@ -0,0 +1,365 @@
+"""Statistical quality check of arithgen generators.
+
+Usage:
+    arithgen-quality [options]
+    arithgen-quality --help
+    arithgen-quality --version
+
+Draw samples from a generation engine and a reference engine, and test
+with chi-square tests that their distributions of root operator,
+operator mix, tree depth, prime factors of literals and result
+magnitude are the same. The depth distribution of both engines is also
+tested against the one implied by the ending probabilities. Throughput
+of both engines is reported. The exit status is 1 if any test fails.
+
+Options:
+    -n, --count=<count>            Specify the sample size of each
+                                   engine. [default: 20000]
+    -d, --difficulty=<difficulty>  Specify the complexity of
+                                   expressions. [default: 3]
+    -e, --engine=<engine>          Specify the engine to test.
+                                   [default: shape]
+    -r, --reference=<engine>       Specify the reference engine.
+                                   [default: recursive]
+    -S, --seed=<seed>              Specify the integer seed.
+                                   [default: 0]
+    -j, --jobs=<jobs>              Number of worker processes.
+                                   [default: 1]
+    -a, --alpha=<alpha>            Significance level of each test.
+                                   [default: 0.001]
+    --min-speedup=<ratio>          Also fail if the engine is slower
+                                   than ratio times the reference.
+"""
+
+import collections
+import concurrent.futures
+import math
+import sys
+import time
+
+from docopt import docopt
+
+from arithgen import __version__
+from arithgen.expr import BinaryExpression, Integer
+from arithgen.generator import ENGINES, expression_rng
+
+
+# Features compared between engines
+FEATURES = ['root_operator', 'operators', 'depth', 'prime_factors',
+            'result_magnitude']
+
+
+def _prime_factors(n):
+    factors = []
+    i = 2
+    while i * i <= n:
+        if n % i == 0:
+            factors.append(i)
+            while n % i == 0:
+                n //= i
+        i += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+class Sample:
+    """Counts of the features of a sample of generated expressions."""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+        self.features = {name: collections.Counter()
+                         for name in FEATURES + ['rejections']}
+
+    def add(self, expr, result, gen):
+        """Add an expression made by the generator gen."""
+        features = self.features
+        self.count += 1
+        root = expr.oper if isinstance(expr, BinaryExpression) else 'leaf'
+        features['root_operator'][root] += 1
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, BinaryExpression):
+                features['operators'][node.oper] += 1
+                stack.append(node.left)
+                stack.append(node.right)
+            elif isinstance(node, Integer):
+                for prime in _prime_factors(abs(node.value)):
+                    features['prime_factors'][prime] += 1
+        features['depth'][gen.tree_depth] += 1
+        features['result_magnitude'][
+            result.numerator.bit_length() -
+            result.denominator.bit_length()] += 1
+        features['rejections'][gen.rejection_count] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.elapsed += other.elapsed
+        for name, counter in other.features.items():
+            self.features[name].update(counter)
+
+
+def _sample_range(engine, difficulty, seed, start, stop, operators):
+    sample = Sample()
+    begin = time.perf_counter()
+    for index in range(start, stop):
+        gen = ENGINES[engine](difficulty, expression_rng(seed, index),
+                              operators=operators)
+        expr, result = gen.gen_expr()
+        sample.add(expr, result, gen)
+    sample.elapsed = time.perf_counter() - begin
+    return sample
+
+
+def draw_sample(count, *, engine, difficulty, seed, jobs=1,
+                chunksize=1000, operators=None):
+    """Return a Sample of count expressions, using jobs processes.
+
+    operators is the OperatorRegistry of the generators, the default
+    registry is used if it is None.
+    """
+    bounds = [(start, min(start + chunksize, count))
+              for start in range(0, count, chunksize)]
+    sample = Sample()
+    if jobs <= 1:
+        for start, stop in bounds:
+            sample.merge(_sample_range(engine, difficulty, seed,
+                                       start, stop, operators))
+        return sample
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        futures = [executor.submit(_sample_range, engine, difficulty,
+                                   seed, start, stop, operators)
+                   for start, stop in bounds]
+        for future in futures:
+            sample.merge(future.result())
+    return sample
+
+
+def chi2_sf(x, dof):
+    """Return the survival function of the chi-square distribution."""
+    if x <= 0:
+        return 1.0
+    return _gamma_q(dof / 2, x / 2)
+
+
+def _gamma_q(a, x):
+    # Regularized upper incomplete gamma function, using the series for
+    # small x and the continued fraction otherwise
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1 - total * math.exp(log_prefix))
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    i = 1
+    while True:
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15 or i > 10000:
+            break
+        i += 1
+    return math.exp(log_prefix) * h
+
+
+def _merge_small_bins(keys, totals, min_total):
+    # Group keys in order, so that every group has a total of at least
+    # min_total; a small last group is merged into the previous one
+    groups = []
+    current = []
+    current_total = 0
+    for key in keys:
+        current.append(key)
+        current_total += totals[key]
+        if current_total >= min_total:
+            groups.append(current)
+            current = []
+            current_total = 0
+    if current:
+        if groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+
+def _sort_keys(keys):
+    return sorted(keys, key=lambda key: (isinstance(key, str), key))
+
+
+def homogeneity_test(counts1, counts2):
+    """Chi-square test that two Counters come from one distribution.
+
+    Return (statistic, degrees of freedom, p-value).
+    """
+    n1 = sum(counts1.values())
+    n2 = sum(counts2.values())
+    totals = counts1 + counts2
+    groups = _merge_small_bins(_sort_keys(totals), totals, 10)
+    statistic = 0.0
+    for group in groups:
+        total = sum(totals[key] for key in group)
+        for counts, n in ((counts1, n1), (counts2, n2)):
+            expected = total * n / (n1 + n2)
+            observed = sum(counts[key] for key in group)
+            statistic += (observed - expected) ** 2 / expected
+    dof = len(groups) - 1
+    if dof < 1:
+        return statistic, 0, 1.0
+    return statistic, dof, chi2_sf(statistic, dof)
+
+
+def goodness_of_fit_test(counts, probs):
+    """Chi-square test of a Counter against probabilities.
+
+    probs maps keys to probabilities. Return (statistic, degrees of
+    freedom, p-value).
+    """
+    n = sum(counts.values())
+    expected = {key: prob * n for key, prob in probs.items()}
+    for key in counts:
+        if key not in expected:
+            expected[key] = 0.0
+    groups = _merge_small_bins(_sort_keys(expected), expected, 5)
+    statistic = 0.0
+    for group in groups:
+        group_expected = sum(expected[key] for key in group)
+        observed = sum(counts[key] for key in group)
+        if group_expected > 0:
+            statistic += (observed - group_expected) ** 2 / group_expected
+        elif observed:
+            statistic = math.inf
+    dof = len(groups) - 1
+    if dof < 1:
+        return statistic, 0, 1.0
+    return statistic, dof, chi2_sf(statistic, dof)
+
+
+def expected_depth_distribution(ending_prob, tolerance=1e-12,
+                                max_depth=1000):
+    """Return the distribution of tree depth as a dict.
+
+    ending_prob(depth) is the probability of a node at depth being a
+    leaf, and each other node has two children. Depths are computed
+    until the remaining probability is below tolerance, or up to
+    max_depth.
+    """
+    probs = {}
+    cumulative = 0.0
+    depth = 0
+    while cumulative < 1 - tolerance and depth <= max_depth:
+        # below is P(a subtree rooted at depth k ends by depth)
+        below = ending_prob(depth)
+        for k in range(depth - 1, -1, -1):
+            p = ending_prob(k)
+            below = p + (1 - p) * below ** 2
+        probs[depth] = below - cumulative
+        cumulative = below
+        depth += 1
+    return probs
+
+
+def run_checks(*, count, engine, reference, difficulty, seed, jobs=1,
+               alpha=0.001, min_speedup=None, operators=None,
+               out=sys.stdout):
+    """Run all tests, print a report to out and return whether passed.
+
+    operators, if not None, is the OperatorRegistry of the tested
+    engine; the reference always uses the default registry.
+    """
+    # Labels tell the samples apart if engine is the same as reference
+    labels = ['reference ' + reference, 'engine ' + engine]
+    samples = []
+    for label, name, engine_seed, engine_operators in (
+            (labels[0], reference, seed, None),
+            (labels[1], engine, seed + 1, operators)):
+        begin = time.perf_counter()
+        sample = draw_sample(count, engine=name, difficulty=difficulty,
+                             seed=engine_seed, jobs=jobs,
+                             operators=engine_operators)
+        wall = time.perf_counter() - begin
+        samples.append(sample)
+        print('{:>20}: {:10.0f} expr/s per process, {:10.0f} expr/s '
+              'wall'.format(label, sample.count / sample.elapsed,
+                            sample.count / wall), file=out)
+    passed = True
+    results = []
+    sample1, sample2 = samples
+    for feature in FEATURES:
+        results.append((feature + ' vs reference', homogeneity_test(
+            sample2.features[feature], sample1.features[feature])))
+    depth_probs = expected_depth_distribution(
+        ENGINES[reference](difficulty)._ending_prob)
+    for label, sample in zip(labels, samples):
+        results.append(('depth of {} vs theory'.format(label),
+                        goodness_of_fit_test(
+                            sample.features['depth'], depth_probs)))
+    for name, (statistic, dof, p_value) in results:
+        ok = p_value >= alpha
+        passed = passed and ok
+        print('{:44} chi2={:10.2f} dof={:3} p={:.4f} {}'.format(
+            name, statistic, dof, p_value, 'PASS' if ok else 'FAIL'),
+            file=out)
+    for label, sample in zip(labels, samples):
+        rejections = sample.features['rejections']
+        mean = sum(k * v for k, v in rejections.items()) / sample.count
+        print('{:>20}: {:.3f} rejections per expression'.format(label,
+                                                                 mean),
+              file=out)
+    if min_speedup is not None:
+        speedup = ((sample2.count / sample2.elapsed) /
+                   (sample1.count / sample1.elapsed))
+        ok = speedup >= min_speedup
+        passed = passed and ok
+        print('speedup {:.2f} (minimum {:.2f}) {}'.format(
+            speedup, min_speedup, 'PASS' if ok else 'FAIL'), file=out)
+    return passed
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = docopt(__doc__, argv=argv,
+                  version='arithgen ' + __version__)
+    try:
+        count = int(args['--count'])
+        difficulty = int(args['--difficulty'])
+        seed = int(args['--seed'])
+        jobs = int(args['--jobs'])
+        alpha = float(args['--alpha'])
+        min_speedup = None
+        if args['--min-speedup'] is not None:
+            min_speedup = float(args['--min-speedup'])
+        for engine in (args['--engine'], args['--reference']):
+            if engine not in ENGINES:
+                raise ValueError('Unknown engine {!r}'.format(engine))
+    except ValueError:
+        print('Invalid arguments')
+        return 1
+    passed = run_checks(
+        count=count,
+        engine=args['--engine'],
+        reference=args['--reference'],
+        difficulty=difficulty,
+        seed=seed,
+        jobs=jobs,
+        alpha=alpha,
+        min_speedup=min_speedup,
+    )
+    return 0 if passed else 1
@@ -19,6 +19,7 @@ Options:
 """
 
 import collections
+import collections.abc
 import math
 import os
 import re
@@ -35,7 +36,7 @@ from arithgen.generator import generate
 def update_recursive(orig_dict, new_dict):
     """Update dict orig_dict with new_dict recursively."""
     for key, val in new_dict.items():
-        if isinstance(val, collections.Mapping):
+        if isinstance(val, collections.abc.Mapping):
             orig_dict[key] = orig_dict.get(key, {})
             update_recursive(orig_dict[key], val)
         else:
@@ -74,14 +75,17 @@ def parse_config_files():
     return config
 
 
+_INTEGER_RE = re.compile(r'[1-9][0-9]*')
+_FRACTION_RE = re.compile(r'([1-9][0-9]*)/([1-9][0-9]*)')
+
+
 def parse_fraction_strict(string):
     if string == '0':
         return Fraction(0)
-    match = re.fullmatch(r'[1-9][0-9]*', string)
+    match = _INTEGER_RE.fullmatch(string)
     if match:
         return Fraction(string)
-    match = re.fullmatch(r'([1-9][0-9]*)/([1-9][0-9]*)',
-                         string)
+    match = _FRACTION_RE.fullmatch(string)
     if match:
         left = int(match.group(1))
         right = int(match.group(2))
@@ -90,19 +94,125 @@ def parse_fraction_strict(string):
     raise ValueError('Format error')
 
 
-def get_valid_user_input(*, prompt='', strict=False):
-    """Return a valid user input as Fraction."""
-    frac_converter = parse_fraction_strict if strict else Fraction
+def get_fraction_parser(*, strict=False):
+    """Return a function converting a string to Fraction.
+
+    The returned function raises ValueError or ZeroDivisionError on
+    invalid input.
+    """
+    return parse_fraction_strict if strict else Fraction
+
+
+def get_valid_user_input(*, prompt='', parse=Fraction):
+    """Return a valid user input as Fraction.
+
+    parse is a function returned by get_fraction_parser().
+    """
     while True:
         user_input = input(prompt)
         try:
-            user_input_fraction = frac_converter(user_input)
+            user_input_fraction = parse(user_input)
         except (ValueError, ZeroDivisionError):
             print('Format error, please try again')
         else:
             return user_input_fraction
 
 
+class QuestionPool:
+    """Prefetch generated questions, grouped by difficulty.
+
+    A pool can be shared by many sessions to amortize generation.
+    prefetch() may run in another thread while questions are taken
+    with get().
+    """
+
+    def __init__(self, *, batch_size=64, low_water=None):
+        self.batch_size = batch_size
+        if low_water is None:
+            low_water = batch_size // 4
+        self.low_water = low_water
+        self._queues = collections.defaultdict(collections.deque)
+
+    def prefetch(self, difficulty, count=None):
+        """Generate count more questions with the given difficulty."""
+        if count is None:
+            count = self.batch_size
+        questions = [generate(difficulty=difficulty) for _ in range(count)]
+        self._queues[difficulty].extend(questions)
+
+    def available(self, difficulty):
+        """Return the number of prefetched questions."""
+        return len(self._queues[difficulty])
+
+    def needs_refill(self, difficulty):
+        """Check whether the queue is at or below the low-water mark."""
+        return self.available(difficulty) <= self.low_water
+
+    def get(self, difficulty):
+        """Return an (expr, result) pair with the given difficulty."""
+        queue = self._queues[difficulty]
+        if not queue:
+            self.prefetch(difficulty)
+        return queue.popleft()
+
+
+class QuizSession:
+    """State of one quiz session, independent of any input or output.
+
+    messages is the messages section of the configuration. Questions
+    are taken from the QuestionPool questions, or generated on demand
+    if it is None.
+    """
+
+    def __init__(self, *, messages, difficulty=3, strict=False,
+                 questions=None):
+        self._messages = messages
+        self.difficulty = difficulty
+        self._questions = questions
+        self.parse_answer = get_fraction_parser(strict=strict)
+        self.expr = None
+        self.result = None
+        self.correct_count = 0
+        self.total_count = 0
+
+    def next_question(self):
+        """Move to the next question and return its expression."""
+        if self._questions is not None:
+            self.expr, self.result = self._questions.get(self.difficulty)
+        else:
+            self.expr, self.result = generate(difficulty=self.difficulty)
+        return self.expr
+
+    def submit(self, user_result):
+        """Check the answer to the current question.
+
+        Return the message to show to the user.
+        """
+        if self.expr is None:
+            raise RuntimeError('No question to answer')
+        if user_result == self.result:
+            message = self._messages['correct-answer']
+            self.correct_count += 1
+        else:
+            message = self._messages['wrong-answer']
+        self.total_count += 1
+        result = self.result
+        self.expr = self.result = None
+        return message.format(result=result, user_result=user_result)
+
+    def summary(self):
+        """Return the summary message, or None if nothing was answered."""
+        if not self.total_count:
+            return None
+        correct_rate = self.correct_count / self.total_count
+        return self._messages['summary'].format(
+            correct_rate=correct_rate,
+            correct_rate_percent=correct_rate * 100,
+            correct_count=self.correct_count,
+            total_count=self.total_count,
+        )
+
+
 def main(argv=None):
     if argv is None:
         argv = sys.argv[1:]
@@ -114,36 +224,23 @@ def main(argv=None):
         print('Invalid arguments')
         return 1
     conf = parse_config_files()
-    total_count = 0
-    total_correct = 0
+    session = QuizSession(
+        messages=conf['messages'],
+        difficulty=difficulty,
+        strict=args['--strict'],
+    )
     while True:
-        expr, result = generate(difficulty=difficulty)
+        expr = session.next_question()
         print(args['--format'].format(expr=expr))
         try:
             user_result = get_valid_user_input(
                 prompt=conf['messages']['prompt'],
-                strict=args['--strict'],
+                parse=session.parse_answer,
             )
         except EOFError:
             print('quit')
             break
-        if user_result == result:
-            print(conf['messages']['correct-answer'].format(
-                result=result,
-                user_result=user_result,
-            ))
-            total_correct += 1
-        else:
-            print(conf['messages']['wrong-answer'].format(
-                result=result,
-                user_result=user_result,
-            ))
-        total_count += 1
-    if not args['--silent'] and total_count:
-        correct_rate = total_correct / total_count
-        print(conf['messages']['summary'].format(
-            correct_rate=correct_rate,
-            correct_rate_percent=correct_rate * 100,
-            correct_count=total_correct,
-            total_count=total_count,
-        ))
+        print(session.submit(user_result))
+    summary = session.summary()
+    if not args['--silent'] and summary is not None:
+        print(summary)
@@ -0,0 +1,193 @@
+"""Quiz server of arithgen.
+
+Usage:
+    arithgen-quiz-server [options]
+    arithgen-quiz-server --help
+    arithgen-quiz-server --version
+
+Serve quiz sessions over a line-based TCP protocol, one session per
+connection. The server sends a question followed by the prompt, and
+the client answers with a line. Sending "!difficulty <difficulty>"
+instead of an answer skips to a question of another allowed difficulty.
+The session ends when the client closes its side of the connection.
+
+Options:
+    -H, --host=<host>                Address to listen on.
+                                     [default: 127.0.0.1]
+    -p, --port=<port>                Port to listen on. [default: 8470]
+    -d, --difficulty=<difficulties>  Comma separated list of allowed
+                                     difficulties, the first one is
+                                     used for new sessions.
+                                     [default: 3]
+    -F, --format=<format>            Specify the output format.
+                                     [default: {expr}]
+    -r, --strict                     Only accept answer with an integer
+                                     or a fraction in the form of a/b
+                                     with gcd(a, b) == 1 and b > 1.
+    -s, --silent                     Suppress summary information
+                                     output.
+"""
+
+import asyncio
+import sys
+
+from docopt import docopt
+
+from arithgen import __version__
+from arithgen.quiz import QuestionPool, QuizSession, parse_config_files
+
+
+_DIFFICULTY_COMMAND = '!difficulty'
+
+
+class QuizServer:
+    """Run many quiz sessions concurrently in one event loop.
+
+    The configuration and the question pool are shared by all sessions.
+    The pool is refilled in executor when it runs low, so generation
+    does not block the event loop.
+    """
+
+    def __init__(self, *, conf, difficulties=(3,), fmt='{expr}',
+                 strict=False, silent=False, questions=None,
+                 executor=None):
+        self._conf = conf
+        self._difficulties = tuple(difficulties)
+        self._fmt = fmt
+        self._strict = strict
+        self._silent = silent
+        if questions is None:
+            questions = QuestionPool()
+        self._questions = questions
+        self._executor = executor
+        self._refills = {}
+
+    def new_session(self):
+        return QuizSession(
+            messages=self._conf['messages'],
+            difficulty=self._difficulties[0],
+            strict=self._strict,
+            questions=self._questions,
+        )
+
+    def _schedule_refill(self, difficulty):
+        refill = self._refills.get(difficulty)
+        if refill is None or refill.done():
+            loop = asyncio.get_running_loop()
+            refill = loop.run_in_executor(
+                self._executor, self._questions.prefetch, difficulty)
+            self._refills[difficulty] = refill
+        return refill
+
+    async def wait_question(self, difficulty):
+        """Wait until a question with the given difficulty is ready."""
+        while True:
+            refill = None
+            if self._questions.needs_refill(difficulty):
+                refill = self._schedule_refill(difficulty)
+            if self._questions.available(difficulty):
+                return
+            await asyncio.shield(refill)
+
+    async def handle(self, reader, writer):
+        """Run a session on a connection."""
+        session = self.new_session()
+        prompt = self._conf['messages']['prompt']
+        try:
+            while True:
+                await self.wait_question(session.difficulty)
+                expr = session.next_question()
+                writer.write(
+                    (self._fmt.format(expr=expr) + '\n' + prompt).encode())
+                user_result = await self._read_answer(
+                    session, reader, writer, prompt)
+                if user_result is None:
+                    break
+                if user_result is _DIFFICULTY_COMMAND:
+                    continue
+                writer.write((session.submit(user_result) + '\n').encode())
+            summary = session.summary()
+            writer.write(b'quit\n')
+            if not self._silent and summary is not None:
+                writer.write((summary + '\n').encode())
+            await writer.drain()
+        except (ConnectionError, ValueError):
+            # ValueError is raised by readline() for over-long lines
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_answer(self, session, reader, writer, prompt):
+        # Return None at end of input, and _DIFFICULTY_COMMAND if the
+        # difficulty has been changed
+        while True:
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                return None
+            try:
+                text = line.decode().strip()
+            except UnicodeDecodeError:
+                text = None
+            if text is not None and text.startswith(_DIFFICULTY_COMMAND):
+                if self._change_difficulty(session, text):
+                    return _DIFFICULTY_COMMAND
+                writer.write(('Invalid difficulty\n' + prompt).encode())
+                continue
+            try:
+                if text is None:
+                    raise ValueError('Undecodable input')
+                return session.parse_answer(text)
+            except (ValueError, ZeroDivisionError):
+                writer.write(
+                    ('Format error, please try again\n' + prompt).encode())
+
+    def _change_difficulty(self, session, text):
+        try:
+            difficulty = int(text[len(_DIFFICULTY_COMMAND):])
+        except ValueError:
+            return False
+        if difficulty not in self._difficulties:
+            return False
+        session.difficulty = difficulty
+        return True
+
+    async def serve(self, host, port):
+        """Listen on host:port and return the asyncio server."""
+        await asyncio.gather(*[self._schedule_refill(difficulty)
+                               for difficulty in self._difficulties])
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def _serve_forever(server, host, port):
+    srv = await server.serve(host, port)
+    async with srv:
+        await srv.serve_forever()
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = docopt(__doc__, argv=argv,
+                  version='arithgen ' + __version__)
+    try:
+        port = int(args['--port'])
+        difficulties = [int(x) for x in args['--difficulty'].split(',')]
+    except ValueError:
+        print('Invalid arguments')
+        return 1
+    server = QuizServer(
+        conf=parse_config_files(),
+        difficulties=difficulties,
+        fmt=args['--format'],
+        strict=args['--strict'],
+        silent=args['--silent'],
+    )
+    try:
+        asyncio.run(_serve_forever(server, args['--host'], port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,141 @@
+"""Render expressions and results in various markup languages."""
+
+import html
+from fractions import Fraction
+
+from arithgen.expr import Division, Integer, needs_parentheses
+
+
+class Renderer:
+    """Render expressions in infix notation.
+
+    Subclasses override the render_* methods for a markup language.
+    Parentheses follow the same rule as Expression.to_string().
+    """
+
+    # Whether integer fractions like 3 / 4 are rendered as one unit with
+    # render_fraction()
+    stacked_fractions = False
+
+    def render(self, expr):
+        """Return the markup of an expression."""
+        if expr.name is not None:
+            return self.render_name(expr.name)
+        if isinstance(expr, Integer):
+            return self.render_integer(expr.value)
+        if self._is_stacked_fraction(expr):
+            return self.render_fraction(expr.left.value, expr.right.value)
+        left = self.render(expr.left)
+        if self._needs_parentheses(expr, expr.left, right=False):
+            left = self.render_parentheses(left)
+        right = self.render(expr.right)
+        if self._needs_parentheses(expr, expr.right, right=True):
+            right = self.render_parentheses(right)
+        return self.render_binary(expr.oper, left, right)
+
+    def _is_stacked_fraction(self, expr):
+        return (self.stacked_fractions and isinstance(expr, Division) and
+                expr.name is None and isinstance(expr.left, Integer) and
+                isinstance(expr.right, Integer) and
+                expr.left.name is None and expr.right.name is None)
+
+    def _needs_parentheses(self, parent, child, *, right):
+        if self._is_stacked_fraction(child):
+            return False
+        return needs_parentheses(parent, child, right=right)
+
+    def render_value(self, value):
+        """Return the markup of a number, such as a result."""
+        value = Fraction(value)
+        if value < 0:
+            return self.render_negative(self.render_value(-value))
+        if value.denominator == 1:
+            return self.render_integer(value.numerator)
+        return self.render_fraction(value.numerator, value.denominator)
+
+    def render_name(self, name):
+        return name
+
+    def render_integer(self, num):
+        return str(num)
+
+    def render_fraction(self, numerator, denominator):
+        return '{}/{}'.format(numerator, denominator)
+
+    def render_negative(self, markup):
+        return '-' + markup
+
+    def render_parentheses(self, markup):
+        return '(' + markup + ')'
+
+    def render_binary(self, oper, left, right):
+        return '{} {} {}'.format(left, oper, right)
+
+
+class PlainRenderer(Renderer):
+    """Render expressions as plain text, like Expression.to_string()."""
+
+
+class LatexRenderer(Renderer):
+    """Render expressions as LaTeX math, without the $ delimiters."""
+
+    stacked_fractions = True
+    operators = {'+': '+', '-': '-', '*': r'\times', '/': r'\div'}
+
+    def render_name(self, name):
+        return r'\mathit{' + escape_latex(name) + '}'
+
+    def render_fraction(self, numerator, denominator):
+        return r'\frac{' + str(numerator) + '}{' + str(denominator) + '}'
+
+    def render_parentheses(self, markup):
+        return r'\left(' + markup + r'\right)'
+
+    def render_binary(self, oper, left, right):
+        return '{} {} {}'.format(left, self.operators[oper], right)
+
+
+class MathMLRenderer(Renderer):
+    """Render expressions as MathML, without the <math> element."""
+
+    stacked_fractions = True
+    operators = {'+': '+', '-': '&#x2212;', '*': '&#xD7;', '/': '&#xF7;'}
+
+    def render_name(self, name):
+        return '<mi>' + html.escape(name) + '</mi>'
+
+    def render_integer(self, num):
+        return '<mn>' + str(num) + '</mn>'
+
+    def render_fraction(self, numerator, denominator):
+        return '<mfrac>{}{}</mfrac>'.format(
+            self.render_integer(numerator), self.render_integer(denominator))
+
+    def render_negative(self, markup):
+        return '<mrow><mo>&#x2212;</mo>' + markup + '</mrow>'
+
+    def render_parentheses(self, markup):
+        return '<mrow><mo>(</mo>' + markup + '<mo>)</mo></mrow>'
+
+    def render_binary(self, oper, left, right):
+        return '<mrow>{}<mo>{}</mo>{}</mrow>'.format(
+            left, self.operators[oper], right)
+
+
+_LATEX_SPECIAL = {
+    '\\': r'\textbackslash{}',
+    '{': r'\{',
+    '}': r'\}',
+    '$': r'\$',
+    '&': r'\&',
+    '#': r'\#',
+    '^': r'\^{}',
+    '_': r'\_',
+    '%': r'\%',
+    '~': r'\~{}',
+}
+
+
+def escape_latex(text):
+    """Escape LaTeX special characters in text."""
+    return ''.join(_LATEX_SPECIAL.get(c, c) for c in text)
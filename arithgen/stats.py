@@ -0,0 +1,198 @@
+"""Streaming statistics over generated expressions.
+
+All statistics use memory independent of the number of expressions and
+can be merged, so batches analyzed by parallel workers can be combined.
+"""
+
+import collections
+import math
+
+from arithgen.expr import BinaryExpression, Integer
+
+
+class Histogram:
+    """Exact counts of discrete values."""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    def add(self, value, count=1):
+        self.counts[value] += count
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+    def to_dict(self):
+        return {str(key): count
+                for key, count in sorted(self.counts.items())}
+
+    @classmethod
+    def from_dict(cls, data, key_type=int):
+        ans = cls()
+        for key, count in data.items():
+            ans.add(key_type(key), count)
+        return ans
+
+
+class QuantileSketch:
+    """Approximate quantiles of non-negative numbers.
+
+    Values are counted in logarithmic buckets, so every quantile is
+    accurate within relative_accuracy and the number of buckets only
+    grows with the logarithm of the value range.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = collections.Counter()
+        self.zero_count = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value < 0:
+            raise ValueError('Negative value {!r}'.format(value))
+        if value == 0:
+            self.zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] += 1
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Cannot merge sketches of different accuracy')
+        self.buckets.update(other.buckets)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        for value in (other.min, other.max):
+            if value is not None:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+
+    def quantile(self, q):
+        """Return the approximate q-quantile, or None if empty."""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'zero_count': self.zero_count,
+            'min': self.min,
+            'max': self.max,
+            'quantiles': {str(q): self.quantile(q)
+                          for q in (0.5, 0.9, 0.99)},
+            'buckets': {str(key): count
+                        for key, count in sorted(self.buckets.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        ans = cls(data['relative_accuracy'])
+        ans.buckets.update({int(key): count
+                            for key, count in data['buckets'].items()})
+        ans.zero_count = data['zero_count']
+        ans.count = data['count']
+        ans.min = data['min']
+        ans.max = data['max']
+        return ans
+
+
+def walk(expr):
+    """Return (depth, node count, operators, literals) of an expression.
+
+    Depth is 0 for a single integer. operators is a list of operator
+    symbols and literals a list of integer values.
+    """
+    operators = []
+    literals = []
+    max_depth = 0
+    stack = [(expr, 0)]
+    while stack:
+        node, depth = stack.pop()
+        max_depth = max(max_depth, depth)
+        if isinstance(node, BinaryExpression):
+            operators.append(node.oper)
+            stack.append((node.left, depth + 1))
+            stack.append((node.right, depth + 1))
+        elif isinstance(node, Integer):
+            literals.append(node.value)
+    return max_depth, len(operators) + len(literals), operators, literals
+
+
+class BatchStatistics:
+    """Distributions over a batch of generated expressions."""
+
+    _histograms = {
+        'depth': int,
+        'node_count': int,
+        'operators': str,
+        'rejections': int,
+    }
+    _sketches = ['literal', 'result', 'result_denominator']
+
+    def __init__(self, relative_accuracy=0.01):
+        self.count = 0
+        for name in self._histograms:
+            setattr(self, name, Histogram())
+        for name in self._sketches:
+            setattr(self, name, QuantileSketch(relative_accuracy))
+
+    def add(self, expr, result, rejections=0):
+        depth, node_count, operators, literals = walk(expr)
+        self.count += 1
+        self.depth.add(depth)
+        self.node_count.add(node_count)
+        for oper in operators:
+            self.operators.add(oper)
+        for literal in literals:
+            self.literal.add(abs(literal))
+        self.rejections.add(rejections)
+        self.result.add(abs(float(result)))
+        self.result_denominator.add(result.denominator)
+
+    def merge(self, other):
+        self.count += other.count
+        for name in list(self._histograms) + self._sketches:
+            getattr(self, name).merge(getattr(other, name))
+
+    def to_dict(self):
+        ans = {'count': self.count}
+        for name in list(self._histograms) + self._sketches:
+            ans[name] = getattr(self, name).to_dict()
+        return ans
+
+    @classmethod
+    def from_dict(cls, data):
+        ans = cls()
+        ans.count = data['count']
+        for name, key_type in cls._histograms.items():
+            setattr(ans, name, Histogram.from_dict(data[name], key_type))
+        for name in cls._sketches:
+            setattr(ans, name, QuantileSketch.from_dict(data[name]))
+        return ans
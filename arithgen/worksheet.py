@@ -0,0 +1,195 @@
+"""Worksheet generator of arithgen.
+
+Usage:
+    arithgen-worksheet [options]
+    arithgen-worksheet --help
+    arithgen-worksheet --version
+
+Write printable worksheets, one page per sheet, and optionally a
+matching answer key. Sheets are generated and written one at a time, so
+memory use does not depend on the number of sheets. The same seed
+always gives the same sheets.
+
+Options:
+    -n, --sheets=<count>           Specify how many sheets to generate.
+                                   [default: 1]
+    -p, --problems=<count>         Specify how many problems are on each
+                                   sheet. [default: 20]
+    -d, --difficulty=<difficulty>  Specify the complexity of
+                                   expressions. [default: 3]
+    -e, --engine=<engine>          Specify the generation engine.
+                                   [default: recursive]
+    -S, --seed=<seed>              Specify the integer seed.
+                                   [default: 0]
+    -b, --backend=<backend>        Specify the output format, latex or
+                                   html. [default: latex]
+    -t, --title=<title>            Specify the title of sheets.
+                                   [default: Worksheet]
+    -o, --output=<file>            Write sheets to a file instead of
+                                   standard output.
+    -a, --answers=<file>           Write the answer key to a file.
+"""
+
+import contextlib
+import html
+import string
+import sys
+
+from docopt import docopt
+
+from arithgen import __version__
+from arithgen.generator import ENGINES, expression_rng, generate
+from arithgen.render import LatexRenderer, MathMLRenderer, escape_latex
+
+
+class Template:
+    """A str.format() style template, parsed once.
+
+    Only plain {name} fields are supported.
+    """
+
+    def __init__(self, source):
+        self._parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(
+                source):
+            if spec or conversion:
+                raise ValueError('Unsupported field {!r}'.format(field))
+            self._parts.append((literal, field))
+
+    def render(self, **fields):
+        return ''.join(
+            literal if field is None else literal + str(fields[field])
+            for literal, field in self._parts)
+
+
+class DocumentFormat:
+    """Templates and renderer of a document format.
+
+    The document, page and item templates get the fields title, number
+    (the sheet number, from 1), expr and result where applicable.
+    """
+
+    def __init__(self, *, renderer, escape, header, page_header, item,
+                 answer_item, page_footer, footer):
+        self.renderer = renderer
+        self.escape = escape
+        self.header = Template(header)
+        self.page_header = Template(page_header)
+        self.item = Template(item)
+        self.answer_item = Template(answer_item)
+        self.page_footer = Template(page_footer)
+        self.footer = Template(footer)
+
+
+LATEX = DocumentFormat(
+    renderer=LatexRenderer(),
+    escape=escape_latex,
+    header=('\\documentclass{{article}}\n'
+            '\\usepackage{{amsmath}}\n'
+            '\\pagestyle{{empty}}\n'
+            '\\begin{{document}}\n'),
+    page_header=('\\section*{{{title} {number}}}\n'
+                 '\\begin{{enumerate}}\n'),
+    item='\\item $\\displaystyle {expr} = $\n',
+    answer_item='\\item $\\displaystyle {expr} = {result}$\n',
+    page_footer='\\end{{enumerate}}\n\\newpage\n',
+    footer='\\end{{document}}\n',
+)
+
+HTML = DocumentFormat(
+    renderer=MathMLRenderer(),
+    escape=html.escape,
+    header=('<!DOCTYPE html>\n'
+            '<html>\n<head>\n<meta charset="utf-8">\n'
+            '<title>{title}</title>\n'
+            '<style>section {{ break-after: page; }}</style>\n'
+            '</head>\n<body>\n'),
+    page_header='<section>\n<h2>{title} {number}</h2>\n<ol>\n',
+    item='<li><math>{expr}<mo>=</mo></math></li>\n',
+    answer_item='<li><math>{expr}<mo>=</mo>{result}</math></li>\n',
+    page_footer='</ol>\n</section>\n',
+    footer='</body>\n</html>\n',
+)
+
+FORMATS = {
+    'latex': LATEX,
+    'html': HTML,
+}
+
+
+def generate_sheet(number, *, problems, difficulty, seed,
+                   engine='recursive'):
+    """Return the (expr, result) pairs of a sheet, numbered from 0.
+
+    Problems are numbered across sheets, so a sheet only depends on the
+    seed and its number.
+    """
+    start = number * problems
+    return [generate(difficulty=difficulty,
+                     rng=expression_rng(seed, index), engine=engine)
+            for index in range(start, start + problems)]
+
+
+def write_sheets(sheets, doc_format, *, title, output, answers=None):
+    """Write an iterable of sheets as a document.
+
+    Each sheet is a list of (expr, result) pairs. If answers is not
+    None, the answer key is written to it as well.
+    """
+    title = doc_format.escape(title)
+    render = doc_format.renderer.render
+    render_value = doc_format.renderer.render_value
+    streams = [output] if answers is None else [output, answers]
+    for stream in streams:
+        stream.write(doc_format.header.render(title=title))
+    for number, sheet in enumerate(sheets, 1):
+        page_header = doc_format.page_header.render(title=title,
+                                                    number=number)
+        for stream in streams:
+            stream.write(page_header)
+        for expr, result in sheet:
+            markup = render(expr)
+            output.write(doc_format.item.render(expr=markup))
+            if answers is not None:
+                answers.write(doc_format.answer_item.render(
+                    expr=markup, result=render_value(result)))
+        for stream in streams:
+            stream.write(doc_format.page_footer.render())
+    for stream in streams:
+        stream.write(doc_format.footer.render())
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = docopt(__doc__, argv=argv,
+                  version='arithgen ' + __version__)
+    try:
+        sheet_count = int(args['--sheets'])
+        problems = int(args['--problems'])
+        difficulty = int(args['--difficulty'])
+        seed = int(args['--seed'])
+        engine = args['--engine']
+        doc_format = FORMATS[args['--backend']]
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine {!r}'.format(engine))
+    except (ValueError, KeyError):
+        print('Invalid arguments')
+        return 1
+    sheets = (generate_sheet(number, problems=problems,
+                             difficulty=difficulty, seed=seed,
+                             engine=engine)
+              for number in range(sheet_count))
+    with contextlib.ExitStack() as stack:
+        try:
+            output = sys.stdout
+            if args['--output'] is not None:
+                output = stack.enter_context(open(args['--output'], 'w'))
+            answers = None
+            if args['--answers'] is not None:
+                answers = stack.enter_context(open(args['--answers'], 'w'))
+        except OSError as e:
+            print('Cannot open file: {}'.format(e))
+            return 1
+        write_sheets(sheets, doc_format, title=args['--title'],
+                     output=output, answers=answers)
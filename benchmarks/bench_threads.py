@@ -0,0 +1,43 @@
+"""Measure scaling of generate_batch() with the number of threads.
+
+Run with python benchmarks/bench_threads.py [count] [difficulty] with
+arithgen installed or on PYTHONPATH. On a free-threaded CPython build
+(3.13t and later) throughput should grow with the number of workers, on
+builds with the GIL it stays flat.
+"""
+
+import os
+import sys
+import sysconfig
+import time
+
+from arithgen.generator import generate_batch
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    count = int(argv[0]) if len(argv) > 0 else 20000
+    difficulty = int(argv[1]) if len(argv) > 1 else 3
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('Python {} (Py_GIL_DISABLED={}, GIL enabled: {})'.format(
+        sys.version.split()[0],
+        sysconfig.get_config_var('Py_GIL_DISABLED'),
+        is_gil_enabled,
+    ))
+    base = None
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        begin = time.perf_counter()
+        generate_batch(count, difficulty=difficulty, seed=0,
+                       workers=workers)
+        elapsed = time.perf_counter() - begin
+        if base is None:
+            base = elapsed
+        print('{:3} workers: {:10.0f} expr/s  speedup {:.2f}x'.format(
+            workers, count / elapsed, base / elapsed))
+        workers *= 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
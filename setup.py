@@ -46,6 +46,11 @@ setup(
         'console_scripts': [
             'arithgen = arithgen.cmdline:main',
             'arithgen-quiz = arithgen.quiz:main',
+            'arithgen-grade = arithgen.grade:main',
+            'arithgen-quiz-server = arithgen.quizserver:main',
+            'arithgen-merge = arithgen.merge:main',
+            'arithgen-worksheet = arithgen.worksheet:main',
+            'arithgen-quality = arithgen.quality:main',
         ],
     },
     zip_safe=True,
@@ -0,0 +1,77 @@
+import json
+import random
+
+import pytest
+
+from arithgen import cmdline, merge
+
+
+def test_parse_shard():
+    assert cmdline.parse_shard('0/1') == (0, 1)
+    assert cmdline.parse_shard('2/5') == (2, 5)
+    for string in ['1/1', '-1/2', '1', 'a/b']:
+        with pytest.raises(ValueError):
+            cmdline.parse_shard(string)
+
+
+def test_shard_range():
+    ranges = [cmdline.shard_range(10, i, 3) for i in range(3)]
+    assert [i for r in ranges for i in r] == list(range(10))
+
+
+def test_sharded_output(capsys):
+    argv = ['-n', '20', '-d', '2', '-S', '42', '-F', '{index} {expr}']
+    cmdline.main(argv)
+    full = capsys.readouterr().out
+    shards = []
+    for i in range(3):
+        cmdline.main(argv + ['--shard', '{}/3'.format(i)])
+        shards.append(capsys.readouterr().out)
+    assert ''.join(shards) == full
+    assert cmdline.main(['--shard', '0/2']) == 1
+
+
+class _Interrupt(Exception):
+    pass
+
+
+@pytest.mark.parametrize('extra_args', [[], ['-S', '5']])
+def test_checkpoint_resume(tmp_path, monkeypatch, extra_args):
+    argv = ['-d', '1'] + extra_args
+    random.seed(56789)
+    cmdline.main(argv + ['-n', '30', '-o', str(tmp_path / 'full')])
+    expected = (tmp_path / 'full').read_text()
+
+    argv += ['-o', str(tmp_path / 'out'), '-c', str(tmp_path / 'ckpt'),
+             '--checkpoint-every', '7']
+    orig_generate = cmdline.generate
+    calls = []
+
+    def failing_generate(**kwargs):
+        calls.append(None)
+        if len(calls) == 17:
+            raise _Interrupt()
+        return orig_generate(**kwargs)
+
+    random.seed(56789)
+    monkeypatch.setattr(cmdline, 'generate', failing_generate)
+    with pytest.raises(_Interrupt):
+        cmdline.main(argv + ['-n', '30'])
+    monkeypatch.setattr(cmdline, 'generate', orig_generate)
+    # Scramble the global state, it must be restored from the checkpoint
+    random.seed(1)
+    cmdline.main(argv + ['-n', '30', '--resume'])
+    assert (tmp_path / 'out').read_text() == expected
+    assert cmdline.main(argv + ['-n', '31', '--resume']) == 1
+
+
+def test_analyze_shards(tmp_path, capsys):
+    argv = ['-n', '30', '-d', '1', '-S', '3', '--analyze']
+    cmdline.main(argv + ['-o', str(tmp_path / 'full')])
+    for i in range(2):
+        cmdline.main(argv + ['--shard', '{}/2'.format(i),
+                             '-o', str(tmp_path / str(i))])
+    merge.main(['--stats', str(tmp_path / '0'), str(tmp_path / '1')])
+    merged = json.loads(capsys.readouterr().out)
+    assert merged == json.loads((tmp_path / 'full').read_text())
+    assert merged['count'] == 30
@@ -1,5 +1,8 @@
+import pickle
 from fractions import Fraction
 
+import pytest
+
 from arithgen import expr
 
 
@@ -94,3 +97,57 @@ def test_string_reverse_polish():
     )
     assert (e.to_reverse_polish() ==
             '3 4 * 2 6 * / 3 5 6 + / - 4 2 + 2 1 - - 6 * +')
+
+
+def test_factory_sharing():
+    factory = expr.ExpressionFactory()
+    a = factory.make(expr.Addition, factory.integer(1), factory.integer(2))
+    b = factory.make(expr.Addition, expr.Integer(1), expr.Integer(2))
+    assert a is b
+    assert a.left is factory.integer(1)
+    c = factory.make(expr.Multiplication, a, b)
+    assert c.left is c.right
+    assert len(factory) == 4
+    assert factory.make(expr.Subtraction, a.left, a.right) is not a
+    assert factory.integer(1, name='x') is not factory.integer(1)
+
+
+def test_factory_intern():
+    factory = expr.ExpressionFactory()
+    tree = expr.Division(
+        expr.Addition(expr.Integer(4), expr.Integer(2)),
+        expr.Addition(expr.Integer(4), expr.Integer(2)),
+    )
+    node = factory.intern(tree)
+    assert node is factory.intern(node)
+    assert node.left is node.right
+    assert factory.evaluate(tree) == 1
+    assert factory.to_string(tree) == str(tree) == '(4 + 2) / (4 + 2)'
+    assert factory.to_string(node) is factory.to_string(node)
+
+
+def test_immutable():
+    factory = expr.ExpressionFactory()
+    one = factory.integer(1)
+    e = factory.make(expr.Addition, one, one)
+    with pytest.raises(AttributeError):
+        one.name = 'x'
+    with pytest.raises(AttributeError):
+        one._num = 2
+    with pytest.raises(AttributeError):
+        e._left = factory.integer(2)
+    with pytest.raises(AttributeError):
+        del e.name
+    assert factory.integer(1) is one
+    assert one.name is None
+    assert factory.to_string(e) == '1 + 1'
+    assert factory.evaluate(e) == 2
+
+
+def test_pickle():
+    e = expr.Division(expr.Integer(1, name='x'), expr.Integer(2))
+    copied = pickle.loads(pickle.dumps(e))
+    assert str(copied) == 'x / 2'
+    assert copied.evaluate() == Fraction(1, 2)
+    with pytest.raises(AttributeError):
+        copied.name = 'y'
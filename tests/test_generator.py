@@ -1,10 +1,12 @@
+import collections
 import itertools
 import math
 import random
+from fractions import Fraction
 
 import pytest
 
-from arithgen import generator
+from arithgen import expr, generator, operators, stats
 
 
 def test_is_valid():
@@ -85,3 +87,82 @@ def test_gen_expr(difficulty, count):
     for _ in range(count):
         e, result = gen.gen_expr()
         assert e.evaluate() == result
+
+
+def test_generate_rng():
+    pairs1 = [generator.generate(difficulty=3, rng=random.Random(42))
+              for _ in range(5)]
+    pairs2 = [generator.generate(difficulty=3, rng=random.Random(42))
+              for _ in range(5)]
+    assert [(str(e), r) for e, r in pairs1] == [(str(e), r)
+                                                for e, r in pairs2]
+
+
+def test_generate_batch():
+    batch1 = generator.generate_batch(50, difficulty=2, seed=7, workers=1,
+                                      chunksize=7)
+    batch2 = generator.generate_batch(30, difficulty=2, seed=7, start=20,
+                                      workers=4, chunksize=5)
+    assert len(batch1) == 50
+    assert len(batch2) == 30
+    assert ([(str(e), r) for e, r in batch1[20:]] ==
+            [(str(e), r) for e, r in batch2])
+    for e, result in batch1:
+        assert e.evaluate() == result
+
+
+@pytest.mark.parametrize('difficulty, count', [
+    (1, 200),
+    (2, 80),
+    (3, 30),
+    (5, 15),
+    (10, 3),
+])
+def test_shape_first_gen_expr(difficulty, count):
+    gen = generator.ShapeFirstGenerator(difficulty, random.Random(45678))
+    for _ in range(count):
+        e, result = gen.gen_expr()
+        assert e.evaluate() == result
+
+
+def test_shape_first_fill_skeleton():
+    gen = generator.ShapeFirstGenerator(2, random.Random(56789))
+    gen._gen_primes()
+    add, sub, mul, div = (operators.ADDITION, operators.SUBTRACTION,
+                          operators.MULTIPLICATION, operators.DIVISION)
+    skeleton = (add, (div, None, None), (sub, None, (mul, None, None)))
+    for _ in range(20):
+        result = gen.gen_fraction()
+        e = gen.fill_skeleton(skeleton, result)
+        assert e.evaluate() == result
+        # The shape is kept even if operators are replaced
+        assert isinstance(e.right.right, expr.BinaryExpression)
+    # 1 cannot be a sum of two positive integers
+    for _ in range(20):
+        e = gen.fill_skeleton((add, None, None), Fraction(1))
+        assert not isinstance(e, expr.Addition)
+        assert e.evaluate() == 1
+
+
+def test_choose_feasible_operator():
+    gen = generator.ShapeFirstGenerator(2, random.Random(67890))
+    counts = collections.Counter(
+        gen.choose_feasible_operator(Fraction(1), 2).name
+        for _ in range(3000))
+    # Addition is infeasible, the others keep weights 2 : 1 : 1
+    assert 'addition' not in counts
+    assert 1300 < counts['subtraction'] < 1700
+    assert 600 < counts['multiplication'] < 900
+
+
+@pytest.mark.parametrize('engine', ['recursive', 'shape'])
+def test_generate_factory(engine):
+    factory = expr.ExpressionFactory()
+    total_nodes = 0
+    for i in range(50):
+        e, result = generator.generate(difficulty=2, rng=random.Random(i),
+                                       engine=engine, factory=factory)
+        assert factory.intern(e) is e
+        assert factory.evaluate(e) == result
+        total_nodes += stats.walk(e)[1]
+    assert len(factory) < total_nodes
@@ -0,0 +1,76 @@
+from fractions import Fraction
+
+from arithgen import grade
+
+
+def test_grader_recompute():
+    grader = grade.Grader()
+    assert grader.grade('1 + 2 / 4', '3/2').status == grade.CORRECT
+    assert grader.grade('1 + 2 / 4', '1.5').status == grade.CORRECT
+    assert grader.grade('1 + 2 / 4', '2').status == grade.WRONG
+    assert grader.grade('1 + 2 / 4', 'abc').status == grade.INVALID
+    assert grader.grade('1 +', '1').status == grade.UNKNOWN
+    assert grader.grade('1 / 0', '1').status == grade.UNKNOWN
+
+
+def test_grader_strict():
+    grader = grade.Grader(strict=True)
+    assert grader.grade('1 + 2 / 4', '3/2').status == grade.CORRECT
+    assert grader.grade('1 + 2 / 4', '6/4').status == grade.INVALID
+    assert grader.grade('1 + 2 / 4', '1.5').status == grade.INVALID
+
+
+def test_grader_key():
+    key = grade.read_key(['q1\t3/4\n', 'q2\t5\n'])
+    assert key == {'q1': Fraction(3, 4), 'q2': 5}
+    grader = grade.Grader(key=key)
+    assert grader.grade('q1', '3/4').status == grade.CORRECT
+    assert grader.grade('q2', '4').status == grade.WRONG
+    assert grader.grade('3', '3').status == grade.UNKNOWN
+
+
+def test_read_records():
+    lines = ['1 + 2\t3\n', '\n', 'no answer\n', 'a\tb\tc\r\n']
+    assert list(grade.read_records(lines)) == [
+        ('1 + 2', '3'), ('no answer', ''), ('a\tb', 'c'),
+    ]
+
+
+def test_grade_records_jobs():
+    records = [('{} * 2'.format(i), str(i * 2 + i % 2))
+               for i in range(200)]
+    serial = list(grade.grade_records(records))
+    parallel = list(grade.grade_records(iter(records), jobs=2,
+                                        chunksize=16))
+    assert parallel == serial
+    summary = grade.GradeSummary()
+    for verdict in serial:
+        summary.add(verdict)
+    assert summary.correct_count == 100
+    assert summary.total_count == 200
+    assert summary.correct_rate == 0.5
+
+
+def test_grade_records_read_ahead():
+    read_count = 0
+
+    def records():
+        nonlocal read_count
+        for i in range(1000):
+            read_count += 1
+            yield '{} + 1'.format(i), str(i + 1)
+
+    verdicts = grade.grade_records(records(), jobs=2, chunksize=10,
+                                   max_pending=3)
+    assert next(verdicts).status == grade.CORRECT
+    assert read_count <= 30
+    assert len(list(verdicts)) == 999
+    assert read_count == 1000
+
+
+def test_main_missing_files(tmp_path, capsys):
+    missing = str(tmp_path / 'missing')
+    assert grade.main(['-k', missing]) == 1
+    assert grade.main(['-o', str(tmp_path / 'no' / 'dir')]) == 1
+    assert grade.main(['-s', missing]) == 1
+    assert capsys.readouterr().out.count('Cannot') == 3
@@ -0,0 +1,28 @@
+import pytest
+
+from arithgen import merge
+
+
+def test_merge_lines():
+    shard1 = ['0 a\n', '3 d\n', '4 e\n']
+    shard2 = ['1 b\n', '2 c\n', '5 f']
+    assert list(merge.merge_lines(shard1, shard2, [])) == [
+        '0 a\n', '1 b\n', '2 c\n', '3 d\n', '4 e\n', '5 f',
+    ]
+
+
+def test_merge_lines_invalid():
+    with pytest.raises(ValueError):
+        list(merge.merge_lines(['0 a\n', '1 b\n'], ['1 c\n']))
+    with pytest.raises(ValueError):
+        list(merge.merge_lines(['x a\n']))
+
+
+def test_main(tmp_path, capsys):
+    (tmp_path / 'a').write_text('0 1 + 2\n2 3\n')
+    (tmp_path / 'b').write_text('1 4 * 5\n')
+    out = tmp_path / 'out'
+    merge.main(['--strip-index', '-o', str(out),
+                str(tmp_path / 'a'), str(tmp_path / 'b')])
+    assert out.read_text() == '1 + 2\n4 * 5\n3\n'
+    assert merge.main([str(tmp_path / 'missing')]) == 1
@@ -0,0 +1,153 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from arithgen import expr, generator, operators
+
+
+def _subtrees(e):
+    yield e
+    for child in e.children:
+        yield from _subtrees(child)
+
+
+class Negation(expr.Expression):
+    """-a expressions."""
+
+    __slots__ = ('_operand',)
+
+    level = 3
+
+    def __init__(self, operand, *, name=None):
+        super().__init__(name=name)
+        object.__setattr__(self, '_operand', operand)
+
+    @property
+    def children(self):
+        return (self._operand,)
+
+    def to_string(self):
+        if self._operand.level is None:
+            return '-' + str(self._operand)
+        return '-(' + str(self._operand) + ')'
+
+    def to_reverse_polish(self):
+        return '{:rpn} neg'.format(self._operand)
+
+    def evaluate(self):
+        return self.apply(self._operand.evaluate())
+
+    @staticmethod
+    def apply(value):
+        return -value
+
+
+def _negated_operands(numgen, maxval, result):
+    return (-result,)
+
+
+# Only feasible for negative results, such as in a - b with a < b
+NEGATION = operators.Operator(
+    'negation', Negation, _negated_operands, arity=1,
+    weights={None: 0}, default_weight=1,
+    is_feasible=lambda maxval, result: result < 0,
+)
+
+
+def test_registry():
+    registry = operators.OperatorRegistry([operators.ADDITION])
+    assert 'addition' in registry
+    assert 'division' not in registry
+    assert registry['addition'] is operators.ADDITION
+    registry.register(operators.DIVISION)
+    assert list(registry) == [operators.ADDITION, operators.DIVISION]
+    registry.unregister('addition')
+    assert len(registry) == 1
+    assert len(operators.default_registry) == 4
+
+
+def test_weights():
+    assert operators.ADDITION.weight(None) == 1
+    assert operators.ADDITION.weight(2) == 2
+    assert operators.MULTIPLICATION.weight(1) == 2
+    assert operators.ADDITION.weight(3) == 1
+    # Generators cache tables built from the weights
+    with pytest.raises(TypeError):
+        operators.ADDITION.weights[None] = 5
+    with pytest.raises(AttributeError):
+        operators.ADDITION.default_weight = 5
+
+
+@pytest.mark.parametrize('engine', ['recursive', 'shape'])
+def test_custom_registry(engine):
+    registry = operators.OperatorRegistry([
+        operators.ADDITION,
+        operators.MULTIPLICATION,
+    ])
+    gen = generator.ENGINES[engine](2, random.Random(3),
+                                    operators=registry)
+    for _ in range(20):
+        e, result = gen.gen_expr()
+        assert e.evaluate() == result
+        assert not any(isinstance(node, expr.Subtraction)
+                       for node in _subtrees(e))
+
+
+def test_custom_operator():
+    # Multiplication by 1 written as a / 1, only allowed at the top
+    def gen_operands(numgen, maxval, result):
+        return result, 1
+
+    oper = operators.Operator('over-one', expr.Division, gen_operands,
+                              weights={None: 100}, default_weight=0)
+    registry = operators.default_registry.copy()
+    registry.register(oper)
+    gen = generator.ExprGenerator(1, random.Random(4), operators=registry)
+    e, result = gen.gen_expr()
+    assert e.evaluate() == result
+    assert isinstance(e, expr.Division)
+    assert e.right.evaluate() == 1
+
+
+def test_no_operator():
+    registry = operators.OperatorRegistry()
+    with pytest.raises(ValueError):
+        generator.ExprGenerator(1, operators=registry)
+
+
+@pytest.mark.parametrize('engine', ['recursive', 'shape'])
+def test_unary_operator(engine):
+    registry = operators.default_registry.copy()
+    registry.register(NEGATION)
+    factory = expr.ExpressionFactory()
+    gen = generator.ENGINES[engine](2, random.Random(5), factory=factory,
+                                    operators=registry)
+    gen.gen_expr()
+    e = gen.gen_expr_with_result(Fraction(-3, 4), parent_level=1)
+    assert e.evaluate() == Fraction(-3, 4)
+    assert factory.evaluate(e) == Fraction(-3, 4)
+    assert factory.intern(e) is e
+    e = gen.gen_operator_with_result(NEGATION, Fraction(-3, 4))
+    assert isinstance(e, Negation)
+    assert e.evaluate() == Fraction(-3, 4)
+    for _ in range(20):
+        e, result = gen.gen_expr()
+        assert e.evaluate() == result
+
+
+def test_unary_operator_skeleton():
+    registry = operators.default_registry.copy()
+    registry.register(NEGATION)
+    gen = generator.ShapeFirstGenerator(2, random.Random(6),
+                                        operators=registry)
+    gen.gen_expr()
+    e = gen.fill_skeleton((NEGATION, None), Fraction(-3, 4),
+                          parent_level=1)
+    assert isinstance(e, Negation)
+    assert e.evaluate() == Fraction(-3, 4)
+    # Negation is infeasible here and replaced by a binary operator
+    e = gen.fill_skeleton((NEGATION, None), Fraction(3, 4),
+                          parent_level=1)
+    assert isinstance(e, expr.BinaryExpression)
+    assert e.evaluate() == Fraction(3, 4)
@@ -0,0 +1,29 @@
+import pytest
+
+from arithgen import expr
+from arithgen.parser import parse_infix
+
+
+def test_parse_infix():
+    string = '3 * 4 / (2 * 6) - 3 / (5 + 6) + (4 + 2 - (2 - 1)) * 6'
+    e = parse_infix(string)
+    assert e.to_string() == string
+    assert e.to_reverse_polish() == (
+        '3 4 * 2 6 * / 3 5 6 + / - 4 2 + 2 1 - - 6 * +')
+
+
+def test_parse_infix_roundtrip():
+    e = expr.Subtraction(
+        expr.Integer(8),
+        expr.Division(expr.Integer(7), expr.Integer(2)),
+    )
+    assert parse_infix(str(e)).to_string() == str(e)
+    assert parse_infix('12').evaluate() == 12
+
+
+@pytest.mark.parametrize('string', [
+    '', '1 +', '(1 + 2', '1 + 2)', '1 ^ 2', '-1', '2 3',
+])
+def test_parse_infix_invalid(string):
+    with pytest.raises(ValueError):
+        parse_infix(string)
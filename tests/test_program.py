@@ -0,0 +1,89 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from arithgen import expr, generator, program
+
+
+def _template():
+    # (x + 1) * (x + 1) / (y - 2 * 3)
+    x = expr.Integer(3, name='x')
+    y = expr.Integer(2, name='y')
+    x_plus_1 = expr.Addition(x, expr.Integer(1))
+    return expr.Division(
+        expr.Multiplication(x_plus_1, x_plus_1),
+        expr.Subtraction(
+            y, expr.Multiplication(expr.Integer(2), expr.Integer(3))),
+    )
+
+
+def test_compile_expression():
+    e = _template()
+    p = program.compile_expression(e)
+    assert p.variables == ('x', 'y')
+    assert p.defaults == {'x': 3, 'y': 2}
+    assert p() == p.run() == e.evaluate()
+    assert p(1, 7) == p.run(1, 7) == Fraction(4)
+    assert p(y=2, x=0) == p.run(0, y=2) == Fraction(-1, 4)
+    # Results stay exact without constants
+    p = program.compile_expression(
+        expr.Division(expr.Integer(1, name='a'), expr.Integer(2, name='b')))
+    assert p(1, 3) == Fraction(1, 3)
+    with pytest.raises(TypeError):
+        p(1, 2, 3)
+    with pytest.raises(TypeError):
+        p(c=1)
+
+
+def test_compile_expression_code():
+    p = program.compile_expression(_template())
+    # 2 * 3 is folded, and x + 1 is computed once
+    assert (program.CONST, Fraction(6)) in p.code
+    assert p.source.count('+') == 1
+    assert [opcode for opcode, arg in p.code].count(program.APPLY) == 5
+
+
+def test_compile_expression_variables():
+    e = _template()
+    p = program.compile_expression(e, variables=['y', 'x'])
+    assert p(7, 1) == Fraction(4)
+    with pytest.raises(ValueError):
+        program.compile_expression(e, variables=['x'])
+    with pytest.raises(ValueError):
+        program.compile_expression(e, variables=['x', 'y', 'z'])
+    # Named operators are variables too
+    e = expr.Addition(
+        expr.Multiplication(expr.Integer(2), expr.Integer(5), name='n'),
+        expr.Integer(1),
+    )
+    p = program.compile_expression(e)
+    assert p.variables == ('n',)
+    assert p() == 11
+    assert p(n=0) == 1
+
+
+def test_evaluate_many():
+    rng = random.Random(1)
+    e, result = generator.generate(difficulty=5, rng=rng)
+    p = program.compile_expression(e)
+    assert p.evaluate_many([()] * 3) == [result] * 3
+    p = program.compile_expression(_template())
+    rows = [(x, y) for x in range(4) for y in range(3)]
+    assert p.evaluate_many(rows) == [p.run(*row) for row in rows]
+
+
+def test_evaluate_arrays():
+    numpy = pytest.importorskip('numpy')
+    p = program.compile_expression(_template())
+    xs = numpy.arange(4)
+    ys = numpy.array([Fraction(1, 2)] * 4, dtype=object)
+    assert list(p.evaluate_arrays(xs, ys)) == [
+        p(x, Fraction(1, 2)) for x in range(4)]
+
+
+def test_evaluate_arrays_without_numpy(monkeypatch):
+    monkeypatch.setattr(program, 'numpy', None)
+    p = program.compile_expression(_template())
+    with pytest.raises(RuntimeError):
+        p.evaluate_arrays([1], [2])
@@ -0,0 +1,86 @@
+import collections
+import io
+import random
+
+import pytest
+
+from arithgen import expr, generator, operators, quality
+
+
+def test_chi2_sf():
+    assert quality.chi2_sf(3.841, 1) == pytest.approx(0.05, abs=1e-4)
+    assert quality.chi2_sf(18.307, 10) == pytest.approx(0.05, abs=1e-4)
+    assert quality.chi2_sf(1, 1) == pytest.approx(0.3173, abs=1e-4)
+    assert quality.chi2_sf(0, 3) == 1.0
+
+
+def test_homogeneity_test():
+    rng = random.Random(1)
+    counts1 = collections.Counter(rng.choice('abc') for _ in range(3000))
+    counts2 = collections.Counter(rng.choice('abc') for _ in range(3000))
+    counts3 = collections.Counter(rng.choice('aabc') for _ in range(3000))
+    statistic, dof, p_value = quality.homogeneity_test(counts1, counts2)
+    assert dof == 2
+    assert p_value > 0.001
+    assert quality.homogeneity_test(counts1, counts3)[2] < 0.001
+    # Sparse bins are pooled
+    counts1['d'] = 1
+    assert quality.homogeneity_test(counts1, counts2)[1] == 2
+
+
+def test_expected_depth_distribution():
+    probs = quality.expected_depth_distribution(lambda depth: 0.6)
+    assert probs[0] == pytest.approx(0.6)
+    # Depth 1: two leaves below the root
+    assert probs[1] == pytest.approx(0.4 * 0.36)
+    assert sum(probs.values()) == pytest.approx(1)
+    # The tail of a critical process decays slowly
+    probs = quality.expected_depth_distribution(lambda depth: 0.5,
+                                                max_depth=50)
+    assert max(probs) == 50
+    gen = generator.ExprGenerator(3)
+    probs = quality.expected_depth_distribution(gen._ending_prob)
+    assert probs[0] == 0
+    sample = collections.Counter()
+    for index in range(2000):
+        gen = generator.ExprGenerator(3, generator.expression_rng(0, index))
+        gen.gen_expr()
+        sample[gen.tree_depth] += 1
+    assert quality.goodness_of_fit_test(sample, probs)[2] > 0.001
+
+
+def test_run_checks():
+    out = io.StringIO()
+    assert quality.run_checks(count=2000, engine='recursive',
+                              reference='recursive', difficulty=3, seed=0,
+                              min_speedup=0, out=out) is True
+    report = out.getvalue()
+    assert 'root_operator vs reference' in report
+    assert 'depth of engine recursive vs theory' in report
+    assert 'speedup' in report
+
+
+def test_run_checks_skewed_weights():
+    registry = operators.default_registry.copy()
+    registry.register(operators.Operator(
+        'addition', expr.Addition, operators.ADDITION.gen_operands,
+        weights={None: 3, 1: 3, 2: 6},
+        is_feasible=operators.ADDITION.is_feasible,
+    ))
+    out = io.StringIO()
+    assert quality.run_checks(count=2000, engine='recursive',
+                              reference='recursive', difficulty=3, seed=0,
+                              jobs=2, operators=registry, out=out) is False
+    assert 'FAIL' in out.getvalue()
+
+
+def test_main_invalid_engine(capsys):
+    assert quality.main(['-e', 'unknown']) == 1
+    assert 'Invalid arguments' in capsys.readouterr().out
+
+
+def test_shape_engine_matches_recursive():
+    out = io.StringIO()
+    assert quality.run_checks(count=4000, engine='shape',
+                              reference='recursive', difficulty=3, seed=0,
+                              out=out) is True, out.getvalue()
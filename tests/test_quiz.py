@@ -1,3 +1,4 @@
+import random
 from fractions import Fraction
 
 import pytest
@@ -27,3 +28,48 @@ def test_parse_fraction_strict():
         quiz.parse_fraction_strict('5/1')
     with pytest.raises(ValueError):
         quiz.parse_fraction_strict('1/0')
+
+
+MESSAGES = {
+    'prompt': '? ',
+    'correct-answer': 'ok',
+    'wrong-answer': '{user_result} != {result}',
+    'summary': '{correct_count}/{total_count}',
+}
+
+
+def test_quiz_session():
+    random.seed(45678)
+    session = quiz.QuizSession(messages=MESSAGES, difficulty=1)
+    assert session.summary() is None
+    expr = session.next_question()
+    assert expr.evaluate() == session.result
+    assert session.submit(session.result) == 'ok'
+    session.next_question()
+    result = session.result
+    assert session.submit(result + 1) == '{} != {}'.format(result + 1,
+                                                           result)
+    assert session.summary() == '1/2'
+    with pytest.raises(RuntimeError):
+        session.submit(Fraction(1))
+
+
+def test_get_valid_user_input(monkeypatch, capsys):
+    session = quiz.QuizSession(messages=MESSAGES, strict=True)
+    inputs = iter(['2/4', '1/2'])
+    monkeypatch.setattr('builtins.input', lambda prompt: next(inputs))
+    assert quiz.get_valid_user_input(
+        parse=session.parse_answer) == Fraction(1, 2)
+    assert 'Format error' in capsys.readouterr().out
+
+
+def test_question_pool():
+    random.seed(45678)
+    pool = quiz.QuestionPool(batch_size=3)
+    session = quiz.QuizSession(messages=MESSAGES, difficulty=2,
+                               questions=pool)
+    for _ in range(5):
+        expr = session.next_question()
+        assert expr.evaluate() == session.result
+        session.submit(session.result)
+    assert session.correct_count == session.total_count == 5
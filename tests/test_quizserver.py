@@ -0,0 +1,87 @@
+import asyncio
+
+from arithgen.parser import parse_infix
+from arithgen.quiz import QuestionPool
+from arithgen.quizserver import QuizServer
+
+
+CONF = {
+    'messages': {
+        'prompt': '? ',
+        'correct-answer': 'ok',
+        'wrong-answer': 'wrong',
+        'summary': '{correct_count}/{total_count}',
+    },
+}
+
+
+async def _run_client(port, answers):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    replies = []
+    question = (await reader.readline()).decode().strip()
+    for answer in answers:
+        assert await reader.readexactly(2) == b'? '
+        if answer == 'right':
+            answer = str(parse_infix(question).evaluate())
+        writer.write(answer.encode() + b'\n')
+        reply = (await reader.readline()).decode().strip()
+        replies.append(reply)
+        if answer.startswith('!difficulty') and reply != 'Invalid difficulty':
+            question = reply
+            replies[-1] = 'skipped'
+        elif reply in ('ok', 'wrong'):
+            question = (await reader.readline()).decode().strip()
+    writer.write_eof()
+    rest = (await reader.read()).decode()
+    writer.close()
+    await writer.wait_closed()
+    return replies, rest
+
+
+async def _run_sessions(answers, count):
+    server = QuizServer(conf=CONF, difficulties=(1, 2),
+                        questions=QuestionPool(batch_size=8))
+    srv = await server.serve('127.0.0.1', 0)
+    port = srv.sockets[0].getsockname()[1]
+    async with srv:
+        return await asyncio.wait_for(asyncio.gather(*[
+            _run_client(port, answers) for _ in range(count)
+        ]), timeout=30)
+
+
+def test_quiz_server():
+    answers = ['right', 'x/0', 'right', '!difficulty 5', '!difficulty 2',
+               'right']
+    results = asyncio.run(_run_sessions(answers, 20))
+    assert len(results) == 20
+    for replies, rest in results:
+        assert replies == ['ok', 'Format error, please try again', 'ok',
+                           'Invalid difficulty', 'skipped', 'ok']
+        assert rest.endswith('quit\n3/3\n')
+
+
+def test_quiz_server_bad_input():
+    answers = [b'\xff\xfe', b'x' * 100000]
+
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await reader.readline()
+        await reader.readexactly(2)
+        writer.write(answers[0] + b'\n')
+        reply = await reader.readline()
+        await reader.readexactly(2)
+        writer.write(answers[1] + b'\n')
+        rest = await reader.read()
+        writer.close()
+        return reply, rest
+
+    async def run():
+        server = QuizServer(conf=CONF, difficulties=(1,))
+        srv = await server.serve('127.0.0.1', 0)
+        port = srv.sockets[0].getsockname()[1]
+        async with srv:
+            return await asyncio.wait_for(client(port), timeout=30)
+
+    reply, rest = asyncio.run(run())
+    assert reply == b'Format error, please try again\n'
+    assert rest == b''
@@ -0,0 +1,53 @@
+from fractions import Fraction
+
+from arithgen import expr, render
+
+
+def _sample():
+    return expr.Subtraction(
+        expr.Multiplication(
+            expr.Division(expr.Integer(3), expr.Integer(4)),
+            expr.Addition(expr.Integer(1), expr.Integer(2)),
+        ),
+        expr.Division(
+            expr.Integer(5),
+            expr.Division(expr.Integer(2), expr.Integer(7)),
+        ),
+    )
+
+
+def test_plain_renderer():
+    e = _sample()
+    assert render.PlainRenderer().render(e) == e.to_string()
+    assert render.PlainRenderer().render_value(Fraction(-3, 4)) == '-3/4'
+
+
+def test_latex_renderer():
+    renderer = render.LatexRenderer()
+    assert renderer.render(_sample()) == (
+        r'\frac{3}{4} \times \left(1 + 2\right) - '
+        r'5 \div \frac{2}{7}')
+    assert renderer.render_value(Fraction(6, 4)) == r'\frac{3}{2}'
+    assert renderer.render_value(Fraction(5)) == '5'
+    e = expr.Division(expr.Integer(1),
+                      expr.Division(expr.Integer(1), expr.Integer(2),
+                                    name='x_1'))
+    assert renderer.render(e) == r'1 \div \left(\mathit{x\_1}\right)'
+
+
+def test_mathml_renderer():
+    renderer = render.MathMLRenderer()
+    e = expr.Multiplication(
+        expr.Division(expr.Integer(3), expr.Integer(4)),
+        expr.Addition(expr.Integer(1), expr.Integer(2)),
+    )
+    assert renderer.render(e) == (
+        '<mrow><mfrac><mn>3</mn><mn>4</mn></mfrac><mo>&#xD7;</mo>'
+        '<mrow><mo>(</mo><mrow><mn>1</mn><mo>+</mo><mn>2</mn></mrow>'
+        '<mo>)</mo></mrow></mrow>')
+    assert renderer.render_value(Fraction(-2)) == (
+        '<mrow><mo>&#x2212;</mo><mn>2</mn></mrow>')
+
+
+def test_escape_latex():
+    assert render.escape_latex('50% & $1_a') == r'50\% \& \$1\_a'
@@ -0,0 +1,67 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from arithgen import expr, generator, stats
+
+
+def test_walk():
+    e = expr.Division(
+        expr.Addition(expr.Integer(4), expr.Integer(2)),
+        expr.Integer(5),
+    )
+    assert stats.walk(e) == (2, 5, ['/', '+'], [5, 2, 4])
+    assert stats.walk(expr.Integer(3)) == (0, 1, [], [3])
+
+
+def test_quantile_sketch():
+    sketch = stats.QuantileSketch(0.01)
+    values = list(range(1, 10001))
+    random.seed(1)
+    random.shuffle(values)
+    for value in values:
+        sketch.add(value)
+    sketch.add(0)
+    assert sketch.count == 10001
+    assert sketch.quantile(0) == 0
+    assert sketch.quantile(1) == 10000
+    assert sketch.quantile(0.5) == pytest.approx(5000, rel=0.011)
+    assert sketch.quantile(0.9) == pytest.approx(9000, rel=0.011)
+    # Memory grows only with the logarithm of the range
+    assert len(sketch.buckets) < 500
+    with pytest.raises(ValueError):
+        sketch.add(-1)
+
+
+def test_quantile_sketch_merge():
+    whole = stats.QuantileSketch()
+    parts = [stats.QuantileSketch() for _ in range(3)]
+    for value in range(1, 3001):
+        whole.add(value)
+        parts[value % 3].add(value)
+    merged = stats.QuantileSketch.from_dict(parts[0].to_dict())
+    merged.merge(parts[1])
+    merged.merge(parts[2])
+    assert merged.to_dict() == whole.to_dict()
+    with pytest.raises(ValueError):
+        merged.merge(stats.QuantileSketch(0.05))
+
+
+def test_batch_statistics():
+    whole = stats.BatchStatistics()
+    parts = [stats.BatchStatistics() for _ in range(2)]
+    for i in range(40):
+        gen = generator.ExprGenerator(2, random.Random(i))
+        e, result = gen.gen_expr()
+        whole.add(e, result, gen.rejection_count)
+        parts[i % 2].add(e, result, gen.rejection_count)
+    merged = stats.BatchStatistics.from_dict(parts[0].to_dict())
+    merged.merge(stats.BatchStatistics.from_dict(parts[1].to_dict()))
+    assert merged.to_dict() == whole.to_dict()
+    assert whole.count == 40
+    assert sum(whole.depth.counts.values()) == 40
+    assert sum(whole.rejections.counts.values()) == 40
+    assert whole.result_denominator.min >= 1
+    whole.add(expr.Integer(3), Fraction(3))
+    assert whole.depth.counts[0] == 1
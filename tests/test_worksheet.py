@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from arithgen import worksheet
+
+
+def test_template():
+    template = worksheet.Template('{a} + {{b}} = {c}')
+    assert template.render(a=1, c='x') == '1 + {b} = x'
+    with pytest.raises(ValueError):
+        worksheet.Template('{a:>3}')
+
+
+@pytest.mark.parametrize('backend', ['latex', 'html'])
+def test_write_sheets(backend):
+    def sheets():
+        for number in range(3):
+            yield worksheet.generate_sheet(number, problems=4,
+                                           difficulty=1, seed=9)
+
+    doc_format = worksheet.FORMATS[backend]
+    output1, answers1 = io.StringIO(), io.StringIO()
+    worksheet.write_sheets(sheets(), doc_format, title='Quiz & more',
+                           output=output1, answers=answers1)
+    output2, answers2 = io.StringIO(), io.StringIO()
+    worksheet.write_sheets(sheets(), doc_format, title='Quiz & more',
+                           output=output2, answers=answers2)
+    assert output1.getvalue() == output2.getvalue()
+    assert answers1.getvalue() == answers2.getvalue()
+    assert output1.getvalue().count(
+        doc_format.page_footer.render()) == 3
+    assert 'Quiz & more' not in output1.getvalue()
+    assert answers1.getvalue().count('=') >= 12
+
+
+def test_generate_sheet():
+    sheet = worksheet.generate_sheet(2, problems=3, difficulty=2, seed=4)
+    again = worksheet.generate_sheet(2, problems=3, difficulty=2, seed=4)
+    assert [str(e) for e, _ in sheet] == [str(e) for e, _ in again]
+    for e, result in sheet:
+        assert e.evaluate() == result